@@ -117,7 +117,9 @@ setup(
 
     entry_points={
         'console_scripts': [
-            'geofinder = geofinder.GeoFinder:entry'
+            'geofinder = geofinder.GeoFinder:entry',
+            'geofilter = geofinder.GeoFilter:entry',
+            'geofinder-cache = geofinder.CacheTool:entry'
         ],
     },
     install_requires=REQUIRED,
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+import gzip
+import json
+import logging
+from typing import List, Tuple
+
+from geodata import Normalize
+from geofinder import ReplacementDictionary
+from geofinder.util import GeoidCheck
+
+EXPORT_FORMAT = 'geofinder-cache'
+EXPORT_VERSION = 1
+REPLACE_STORE = 'global_replace'
+SKIP_STORE = 'skiplist'
+
+
+class ImportResult:
+    """ Counts and conflict list from import_caches """
+
+    def __init__(self):
+        self.added = 0
+        self.unchanged = 0
+        self.overwritten = 0
+        self.skip_added = 0
+        # (key, local (geoid, prefix), incoming (geoid, prefix))
+        self.conflicts: List[Tuple[str, tuple, tuple]] = []
+        # (key, geoid) - GEOID not found in geodata.db
+        self.invalid: List[Tuple[str, str]] = []
+
+    def summary(self) -> str:
+        return (f'Global replace: {self.added} added, {self.unchanged} unchanged, {len(self.conflicts)} conflicts '
+                f'({self.overwritten} overwritten), {len(self.invalid)} invalid GEOIDs.  Skiplist: {self.skip_added} added')
+
+
+def _open(path: str, mode: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def _dumps(record: dict) -> str:
+    return json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+
+def export_caches(path: str, replace_cd, skip_cd) -> int:
+    """
+    Export global replace and skiplist to a JSON lines file (GZIP if path ends in .gz).
+    First line is a header with the format version, followed by one line per entry sorted by store and key,
+    so two exports can be compared with diff.
+    #Args:
+        path: Output file
+        replace_cd: Global replace dictionary
+        skip_cd: Skiplist dictionary
+    #Returns:
+        Number of entries written
+    """
+    count = 0
+    with _open(path, 'w') as file:
+        file.write(_dumps({'format': EXPORT_FORMAT, 'version': EXPORT_VERSION,
+                           'entry_format': ReplacementDictionary.get_format_version()}) + '\n')
+        for key in sorted(replace_cd.dict):
+            prefix, geoid = ReplacementDictionary.parse_replacement_entry(replace_cd.dict[key])
+            file.write(_dumps({'store': REPLACE_STORE, 'key': key, 'geoid': geoid, 'prefix': prefix}) + '\n')
+            count += 1
+        for key in sorted(skip_cd.dict):
+            file.write(_dumps({'store': SKIP_STORE, 'key': key}) + '\n')
+            count += 1
+    return count
+
+
+def import_caches(path: str, replace_cd, skip_cd, geodb_conn=None, overwrite: bool = False) -> ImportResult:
+    """
+    Merge an export file into global replace and skiplist.  New entries are added.  An entry with a different
+    GEOID or prefix than the local entry is a conflict:  the local entry is kept unless overwrite is True.
+    If geodb_conn is given, GEOIDs of entries to add are checked against geodata.db in bulk and entries
+    with unknown GEOIDs are rejected.  Caller writes the dictionaries.
+    #Args:
+        path: Export file
+        replace_cd: Global replace dictionary
+        skip_cd: Skiplist dictionary
+        geodb_conn: sqlite3 connection to geodata.db or None to skip validation
+        overwrite: If True, incoming entry replaces local entry on conflict
+    #Returns:
+        ImportResult
+    #Raises:
+        ValueError if file is not an export file or is a newer version
+    """
+    logger = logging.getLogger(__name__)
+    result = ImportResult()
+    incoming = {}
+    with _open(path, 'r') as file:
+        header = json.loads(file.readline() or '{}')
+        if header.get('format') != EXPORT_FORMAT:
+            raise ValueError(f'{path} is not a GeoFinder export file')
+        if header.get('version', 0) > EXPORT_VERSION:
+            raise ValueError(f"{path} is export version {header.get('version')}.  Please upgrade GeoFinder")
+        for line in file:
+            record = json.loads(line)
+            if record['store'] == REPLACE_STORE:
+                key = Normalize.normalize(text=record['key'], remove_commas=False)
+                incoming[key] = (record['geoid'], record['prefix'])
+            elif record['store'] == SKIP_STORE:
+                if skip_cd.get(record['key']) is None:
+                    skip_cd.dict[record['key']] = ' '
+                    result.skip_added += 1
+
+    # Find entries to add and conflicts
+    candidates = {}
+    for key, (geoid, prefix) in incoming.items():
+        local = replace_cd.get(key)
+        if local is None:
+            candidates[key] = (geoid, prefix)
+            continue
+        local_prefix, local_geoid = ReplacementDictionary.parse_replacement_entry(local)
+        if (local_geoid, local_prefix) == (geoid, prefix):
+            result.unchanged += 1
+        else:
+            result.conflicts.append((key, (local_geoid, local_prefix), (geoid, prefix)))
+            if overwrite:
+                candidates[key] = (geoid, prefix)
+
+    # Validate all GEOIDs in one pass
+    missing = set()
+    if geodb_conn is not None:
+        missing = GeoidCheck.find_missing(geodb_conn, [geoid for geoid, prefix in candidates.values()])
+
+    for key, (geoid, prefix) in candidates.items():
+        if geoid in missing:
+            result.invalid.append((key, geoid))
+            continue
+        if replace_cd.get(key) is None:
+            result.added += 1
+        else:
+            result.overwritten += 1
+        replace_cd.dict[key] = ReplacementDictionary.build_replacement_entry(geoid, prefix)
+
+    logger.debug(result.summary())
+    return result
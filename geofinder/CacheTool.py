@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+from geodata import GeoUtil
+from geofinder import CacheExport, ReplacementDictionary
+from geofinder.util import IniHandler, SqliteDictionary
+
+
+class CacheTool:
+    """
+    Command line maintenance for the GeoFinder dictionaries:
+
+        geofinder-cache stats                 Show entry counts and number of runs
+        geofinder-cache compact --runs 20     Archive global replace entries not used in the last 20 runs
+        geofinder-cache restore               Move all archived entries back
+        geofinder-cache export places.jsonl   Export global replace and skiplist to share with others
+        geofinder-cache import places.jsonl   Merge an export into global replace and skiplist
+        geofinder-cache revalidate            Quarantine global replace entries whose GEOID isn't in geodata.db
+    """
+
+    def __init__(self, directory):
+        self.logger = logging.getLogger(__name__)
+        self.directory = directory
+        self.cache_dir = GeoUtil.get_cache_directory(self.directory)
+        self.global_replace = SqliteDictionary.SqliteDictionary(self.cache_dir, "global_replace.pkl")
+        self.global_replace.read()
+        self.skiplist = SqliteDictionary.SqliteDictionary(self.cache_dir, "skiplist.pkl")
+        self.skiplist.read()
+
+    def stats(self):
+        stats = self.global_replace.usage_stats()
+        print(f"Global replace: {stats['entries']} entries, {stats['never_hit']} never used, "
+              f"{stats['archived']} archived.  Runs={stats['run_count']}")
+
+    def compact(self, runs: int):
+        count = self.global_replace.compact(runs)
+        print(f'Global replace: archived {count} entries not used in the last {runs} runs')
+
+    def restore(self):
+        count = self.global_replace.restore_archive()
+        print(f'Global replace: restored {count} entries')
+
+    def export(self, path: str):
+        count = CacheExport.export_caches(path, self.global_replace, self.skiplist)
+        print(f'Exported {count} entries to {path}')
+
+    def open_geodb(self):
+        """ Open geodata.db read only.  None if not found """
+        db_path = os.path.join(self.cache_dir, 'geodata.db')
+        if not os.path.exists(db_path):
+            self.logger.warning(f'{db_path} not found')
+            return None
+        return sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+
+    def revalidate(self):
+        conn = self.open_geodb()
+        if conn is None:
+            return True
+        quarantined, restored, report_path = ReplacementDictionary.revalidate_cache(self.cache_dir,
+                                                                                    self.global_replace, conn,
+                                                                                    force=True)
+        conn.close()
+        print(f'Global replace: {len(quarantined)} entries quarantined, {len(restored)} restored')
+        if len(quarantined) > 0 or len(restored) > 0:
+            print(f'See {report_path}')
+        return False
+
+    def import_file(self, path: str, overwrite: bool, validate: bool, report_path: str):
+        conn = None
+        if validate:
+            conn = self.open_geodb()
+            if conn is None:
+                self.logger.warning('GEOIDs will not be validated')
+        try:
+            result = CacheExport.import_caches(path, self.global_replace, self.skiplist, geodb_conn=conn,
+                                               overwrite=overwrite)
+        except (OSError, ValueError) as e:
+            print(f'Import error: {e}', file=sys.stderr)
+            return True
+        finally:
+            if conn is not None:
+                conn.close()
+        self.global_replace.write()
+        self.skiplist.write()
+        print(result.summary())
+
+        # Conflicts and invalid entries - one tab separated line per entry
+        out = open(report_path, 'w', encoding='utf-8') if report_path else sys.stdout
+        for key, local, incoming in result.conflicts:
+            out.write(f'CONFLICT\t{key}\tlocal={local[0]} {local[1]}\tincoming={incoming[0]} {incoming[1]}\n')
+        for key, geoid in result.invalid:
+            out.write(f'INVALID GEOID\t{key}\t{geoid}\n')
+        if out is not sys.stdout:
+            out.close()
+        return False
+
+    def close(self):
+        self.global_replace.close()
+        self.skiplist.close()
+
+
+def entry():
+    parser = argparse.ArgumentParser(description='GeoFinder dictionary maintenance')
+    parser.add_argument("--directory", help="GeoFinder data directory.  Default is setting in geofinder.ini")
+    parser.add_argument("--logging", help="info - Enable quiet logging")
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('stats', help='Show entry counts and number of runs')
+    compact_parser = subparsers.add_parser('compact', help='Archive global replace entries not used in N runs')
+    compact_parser.add_argument("--runs", type=int, default=20, help="Number of runs.  Default is 20")
+    subparsers.add_parser('restore', help='Move archived global replace entries back')
+    export_parser = subparsers.add_parser('export', help='Export global replace and skiplist.  .gz for GZIP')
+    export_parser.add_argument("path", help="Export file")
+    import_parser = subparsers.add_parser('import', help='Merge an export file into global replace and skiplist')
+    import_parser.add_argument("path", help="Export file")
+    import_parser.add_argument("--overwrite", help="on - Incoming entries replace local entries on conflict")
+    import_parser.add_argument("--validate", default='on', help="off - Don't check GEOIDs against geodata.db")
+    import_parser.add_argument("--report", help="File for conflicts and invalid GEOIDs.  Default is stdout")
+    subparsers.add_parser('revalidate', help="Quarantine global replace entries whose GEOID isn't in geodata.db")
+    args = parser.parse_args()
+
+    fmt = "%(levelname)s %(name)s.%(funcName)s %(lineno)d: %(message)s"
+    if args.logging == 'info':
+        logging.basicConfig(level=logging.INFO, stream=sys.stderr, format=fmt)
+    else:
+        logging.basicConfig(level=logging.DEBUG, stream=sys.stderr, format=fmt)
+
+    if args.directory:
+        directory = args.directory
+    else:
+        home_path = str(Path.home())
+        ini_handler = IniHandler.IniHandler(base_path=home_path, ini_name='geofinder.ini')
+        directory = ini_handler.get_directory_from_ini("GeoFinder", GeoUtil.get_directory_name())
+
+    if args.command is None:
+        parser.print_help()
+        sys.exit(1)
+
+    if not os.path.exists(GeoUtil.get_cache_directory(directory)):
+        print(f'Cache folder not found: {GeoUtil.get_cache_directory(directory)}', file=sys.stderr)
+        sys.exit(1)
+
+    tool = CacheTool(directory=directory)
+    if args.command == 'stats':
+        tool.stats()
+    elif args.command == 'compact':
+        tool.compact(args.runs)
+    elif args.command == 'restore':
+        tool.restore()
+    elif args.command == 'export':
+        tool.export(args.path)
+    elif args.command == 'import':
+        err = tool.import_file(args.path, overwrite=args.overwrite == 'on', validate=args.validate != 'off',
+                               report_path=args.report)
+        if err:
+            tool.close()
+            sys.exit(1)
+    elif args.command == 'revalidate':
+        if tool.revalidate():
+            tool.close()
+            sys.exit(1)
+    tool.close()
+
+
+if __name__ == "__main__":
+    entry()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+import argparse
+import logging
+import sys
+from pathlib import Path
+from typing import Dict
+
+from geodata import Normalize, GeoUtil, Loc
+from geodata.Geodata import Geodata
+from geofinder import ReplaceIndex, ReplacementDictionary, SkipMatcher
+from geofinder.ancestry import Gedcom
+from geofinder.ancestry.AncestryFile import STREAM_PATH
+from geofinder.util import IniHandler, SqliteDictionary
+
+
+class GeoFilter:
+    """
+    Run GeoFinder as a Unix filter with no GUI:  GEDCOM in on stdin, geocoded GEDCOM out on stdout.
+
+    Places with a Global Replace entry or a strong match are updated with the lat/lon.  Skipped places
+    and places that need user review are written out as-is and listed in the review file (a side channel)
+    so they can be handled later in an interactive GeoFinder session.
+    Review file format is one tab separated line per place:  record ID, event, place, result
+
+        gunzip -c tree.ged.gz | geofilter --review tree.review.txt --compress on > tree.import.ged.gz
+    """
+
+    def __init__(self, directory, review_file, compress: bool = False):
+        """
+        #Args:
+            directory: GeoFinder data directory
+            review_file: Open text file for review items
+            compress: If True, write GZIP compressed output
+        """
+        self.logger = logging.getLogger(__name__)
+        self.directory = directory
+        self.cache_dir = GeoUtil.get_cache_directory(self.directory)
+        self.review_file = review_file
+        self.compress = compress
+        self.matched_count = 0
+        self.review_count = 0
+        self.skip_count = 0
+        self.geodata = None
+        self.skiplist = None
+        self.skip_matcher = None
+        self.global_replace = None
+        self.variant_index = None
+        self.ancestry_file_handler = None
+
+    def load_data_files(self) -> bool:
+        """
+        Load global_replace dictionary, skiplist, and geodata
+        #Returns:
+            Error - True if error occurred
+        """
+        self.skiplist = SqliteDictionary.SqliteDictionary(self.cache_dir, "skiplist.pkl")
+        self.skiplist.read()
+        self.skip_matcher = SkipMatcher.SkipMatcher(self.skiplist.dict)
+        self.global_replace = SqliteDictionary.SqliteDictionary(self.cache_dir, "global_replace.pkl")
+        self.global_replace.read()
+
+        # Normalize global_replace keys and convert entries if stored with a different format version
+        ReplacementDictionary.migrate(self.global_replace)
+        self.global_replace.start_run()
+        self.variant_index = ReplaceIndex.VariantIndex(self.global_replace.dict)
+
+        feature_code_list_cd = SqliteDictionary.SqliteDictionary(self.cache_dir, "feature_list.pkl")
+        feature_code_list_cd.read()
+        supported_countries_cd = SqliteDictionary.SqliteDictionary(self.cache_dir, "country_list.pkl")
+        supported_countries_cd.read()
+        languages_list_cd = SqliteDictionary.SqliteDictionary(self.cache_dir, "languages_list.pkl")
+        languages_list_cd.read()
+        feature_code_list_dct: Dict[str, str] = feature_code_list_cd.dict
+        supported_countries_dct: Dict[str, str] = supported_countries_cd.dict
+        languages_list_dct: Dict[str, str] = languages_list_cd.dict
+
+        self.geodata = Geodata(directory_name=self.directory, progress_bar=None,
+                               enable_spell_checker=False,
+                               show_message=False, exit_on_error=False,
+                               languages_list_dct=languages_list_dct,
+                               feature_code_list_dct=feature_code_list_dct,
+                               supported_countries_dct=supported_countries_dct)
+        error = self.geodata.open()
+        if error:
+            self.logger.error(f'Unable to open geodata in {self.directory}')
+            return error
+
+        # If geodata.db was rebuilt, quarantine global replace entries whose GEOID is gone
+        quarantined, restored, report_path = ReplacementDictionary.revalidate_cache(
+            self.cache_dir, self.global_replace, self.geodata.geo_files.geodb.db.conn)
+        # Variant lookup only drops a county if it is named like one or is a known admin2 name
+        self.variant_index.set_county_names(ReplaceIndex.load_county_names(self.geodata.geo_files.geodb.db.conn))
+        if len(quarantined) > 0 or len(restored) > 0:
+            self.logger.warning(f'Global replace: {len(quarantined)} entries quarantined, {len(restored)} restored.  '
+                                f'See {report_path}')
+        return error
+
+    def run(self):
+        """ Read each place from stdin, resolve it if we can, and write the result to stdout """
+        self.ancestry_file_handler = Gedcom.Gedcom(in_path=STREAM_PATH, out_suffix='out', cache_d=self.cache_dir,
+                                                   progress=None, compress=self.compress)
+        place: Loc.Loc = Loc.Loc()
+
+        while True:
+            place.clear()
+            town_entry, eof, rec_id = self.ancestry_file_handler.get_next_place()
+            if eof:
+                break
+            place.updated_entry = town_entry
+            place.id = rec_id
+            town_entry = Normalize.normalize(text=town_entry, remove_commas=False)
+
+            key = town_entry
+            entry = self.global_replace.get(key) or self.global_replace.get_stored(key)
+            if not entry:
+                # Variant of a stored key - spacing, punctuation, abbreviation or missing county
+                key, entry = self.variant_index.lookup(town_entry)
+            if entry:
+                self.global_replace.record_hit(key)
+                # There is already a global change that we can apply to this entry.
+                place.prefix, geoid = ReplacementDictionary.parse_replacement_entry(entry)
+                if len(geoid) == 0:
+                    # DELETE - Don't write out this place
+                    self.matched_count += 1
+                    continue
+                self.geodata.find_geoid(geoid, place)
+                place.set_place_type()
+                if len(place.prefix) > 0:
+                    place.prefix_commas = ','
+                if place.result_type == GeoUtil.Result.STRONG_MATCH:
+                    self.matched_count += 1
+                    self.write_updated_place(place)
+                else:
+                    self.write_review(town_entry, f'DATABASE ERROR FOR GEOID={geoid}')
+            elif self.skip_matcher.match(town_entry):
+                # SKIP - User marked place as SKIP - Write out as-is
+                self.skip_count += 1
+                self.ancestry_file_handler.write_asis(town_entry)
+            else:
+                place.event_year = int(self.ancestry_file_handler.event_year)
+                self.geodata.find_matches(town_entry, place, False)
+                if place.result_type == GeoUtil.Result.STRONG_MATCH:
+                    self.matched_count += 1
+                    self.global_replace.set(town_entry,
+                                            ReplacementDictionary.build_replacement_entry(place.geoid, place.prefix))
+                    self.variant_index.add(town_entry)
+                    self.write_updated_place(place)
+                else:
+                    place.set_types_as_string()
+                    self.write_review(town_entry, place.result_type_text)
+
+        self.logger.info(f'Matched={self.matched_count} Skipped={self.skip_count} Needed Review={self.review_count}')
+        self.ancestry_file_handler.close()
+        self.global_replace.write()
+        self.geodata.geo_files.geodb.close()
+
+    def write_updated_place(self, place: Loc.Loc):
+        """ Write out updated location and lat/lon """
+        self.geodata.geo_files.geodb.set_display_names(place)
+        place.original_entry = place.get_long_name(self.geodata.geo_files.output_replace_dct)
+        prefix = GeoUtil.capwords(place.prefix)
+        self.ancestry_file_handler.write_updated(prefix + place.prefix_commas + place.original_entry, place)
+        self.ancestry_file_handler.write_lat_lon(lat=place.lat, lon=place.lon)
+
+    def write_review(self, town_entry: str, result: str):
+        """ Write place out as-is and add it to review file """
+        self.review_count += 1
+        self.ancestry_file_handler.write_asis(town_entry)
+        handler = self.ancestry_file_handler
+        self.review_file.write(f'{handler.id}\t{handler.event_name} {handler.date}\t{handler.value}\t{result}\n')
+
+
+def entry():
+    parser = argparse.ArgumentParser(description='GeoFinder filter:  GEDCOM on stdin, geocoded GEDCOM on stdout')
+    parser.add_argument("--review", help="File for places that need review.  Default is stderr")
+    parser.add_argument("--directory", help="GeoFinder data directory.  Default is setting in geofinder.ini")
+    parser.add_argument("--logging", help="info - Enable quiet logging")
+    parser.add_argument("--compress", help="on - Write GZIP compressed output")
+    args = parser.parse_args()
+
+    # stdout is the output stream so all logging goes to stderr
+    fmt = "%(levelname)s %(name)s.%(funcName)s %(lineno)d: %(message)s"
+    if args.logging == 'info':
+        logging.basicConfig(level=logging.INFO, stream=sys.stderr, format=fmt)
+    else:
+        logging.basicConfig(level=logging.DEBUG, stream=sys.stderr, format=fmt)
+
+    if args.directory:
+        directory = args.directory
+    else:
+        home_path = str(Path.home())
+        ini_handler = IniHandler.IniHandler(base_path=home_path, ini_name='geofinder.ini')
+        directory = ini_handler.get_directory_from_ini("GeoFinder", GeoUtil.get_directory_name())
+
+    if args.review:
+        review_file = open(args.review, 'w', encoding='utf-8')
+    else:
+        review_file = sys.stderr
+
+    geo_filter = GeoFilter(directory=directory, review_file=review_file, compress=args.compress == 'on')
+    if geo_filter.load_data_files():
+        sys.exit(1)
+    geo_filter.run()
+    if review_file is not sys.stderr:
+        review_file.close()
+
+
+if __name__ == "__main__":
+    entry()
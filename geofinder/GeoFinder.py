@@ -33,10 +33,10 @@ from geodata import Normalize, GeoUtil, Loc
 from geodata import  __version__ as geodata_version
 from geodata.Geodata import ResultFlags, Geodata
 from tk_helper import TKHelper
-from geofinder import ReplacementDictionary
+from geofinder import ReplaceIndex, ReplacementDictionary, SkipMatcher
 from geofinder import AppLayout
 from geofinder import __version__
-from geofinder.util import CachedDictionary, Config, IniHandler
+from geofinder.util import Config, IniHandler, SqliteDictionary
 from geofinder.ancestry import Gedcom, GrampsXml
 from geofinder.util_menu import UtilFeatureFrame, UtilLayout
 
@@ -96,12 +96,21 @@ class GeoFinder:
         self.ancestry_file_handler = None
         self.place = None
         self.skiplist = None
+        self.skip_matcher = None
         self.global_replace = None
+        self.variant_index = None
+        self.ngram_index = None
+        self.review_key = ''
+        self.supported_countries_cd = None
         self.geodata = None
         self.out_suffix = 'unknown_suffix'
         self.out_diag_file = None
         self.in_diag_file = None
         self.enable_spell_checker = False
+        self.incremental = False
+        self.compress = False
+        self.hierarchy = False
+        self.csv_max_rows = 0
 
         # get command line arguments
         self.get_command_line_arguments()
@@ -134,19 +143,33 @@ class GeoFinder:
         self.load_data_files()
         ged_path = self.cfg.get("gedcom_path")  # Get saved config setting for  file
 
+        # Stamp that previous results are checked against.  Only needed for incremental runs
+        if self.incremental:
+            stamp = ReplacementDictionary.get_record_stamp(self.geodata.geo_files.geodb.db.conn)
+        else:
+            stamp = ''
+
         # Load appropriate ancestry file handler based on file type (Gramps XML or GEDCOM)
         if ged_path is not None:
             if '.ged' in ged_path:
                 # GEDCOM
                 self.out_suffix = "import.ged"
                 self.ancestry_file_handler = Gedcom.Gedcom(in_path=ged_path, out_suffix=temp_suffix, cache_d=self.cache_dir,
-                                                           progress=None)  # Routines to open and parse GEDCOM file
+                                                           progress=None, incremental=self.incremental,
+                                                           compress=self.compress,
+                                                           stamp=stamp, replace_cd=self.global_replace)  # Routines to open and parse GEDCOM file
             elif '.gramps' in ged_path:
                 # GRAMPS
                 self.out_suffix = "import.gramps"
                 # self.out_suffix = "csv"
+                # Progress bar shows the XML write and CSV enclosures at the end of the places
                 self.ancestry_file_handler = GrampsXml.GrampsXml(in_path=ged_path, out_suffix=temp_suffix, cache_d=self.cache_dir,
-                                                                 progress=None, geodata=self.geodata)  # Routines to open and parse Gramps file
+                                                                 progress=self.w.prog, geodata=self.geodata,
+                                                                 incremental=self.incremental,
+                                                                 hierarchy=self.hierarchy,
+                                                                 csv_max_rows=self.csv_max_rows,
+                                                                 compress=self.compress,
+                                                                 stamp=stamp, replace_cd=self.global_replace)  # Routines to open and parse Gramps file
         else:
             self.out_suffix = 'unk.new.ged'
             messagebox.showwarning(f'UNKNOWN File type. Not .gramps and not .ged. \n\n{ged_path}')
@@ -195,6 +218,7 @@ class GeoFinder:
             self.place.updated_entry = town_entry
             self.place.id = rec_id
             town_entry = Normalize.normalize(text=town_entry, remove_commas=False)
+            self.review_key = town_entry
 
             if eof:
                 self.end_of_file_shutdown()
@@ -228,7 +252,7 @@ class GeoFinder:
                     self.geodata.find_matches(town_entry, self.place, self.w.prog.shutdown_requested)
                     break
                 continue
-            elif self.skiplist.get(town_entry) is not None:
+            elif self.skip_matcher.match(town_entry):
                 # SKIP - User marked place as SKIP - Write out as-is and go to next error
                 self.skip_count += 1
                 self.periodic_update("Skipping")
@@ -238,7 +262,9 @@ class GeoFinder:
                 # FOUND a PLACE entry that we don't already have a global replace or skip for
                 # See if it is in the place database
                 self.place.event_year = int(self.ancestry_file_handler.event_year)  # Set place date to event date (geo names change over time)
-                self.geodata.find_matches(town_entry, self.place, self.w.prog.shutdown_requested)
+                if not self.ancestry_file_handler.lookup_in_parent(self.place):
+                    # Not a unique name within its enclosing place - do full lookup
+                    self.geodata.find_matches(town_entry, self.place, self.w.prog.shutdown_requested)
 
                 if self.place.result_type in GeoUtil.successful_match:
                     # STRONG MATCH
@@ -411,6 +437,9 @@ class GeoFinder:
             self.w.user_entry.focus()  # Set focus to text edit widget
             self.display_one_georow(place.status_detail, place.geoid, score=9999, feat='')
 
+        # Offer resolved places that are similar to this one
+        self.display_similar_fixes(place)
+
         # Display GEDCOM person and event that this location refers to
         self.w.ged_event_info.text = f'{self.ancestry_file_handler.get_name(self.ancestry_file_handler.id)}: ' \
             f'{self.ancestry_file_handler.event_name} {self.ancestry_file_handler.date}'
@@ -445,6 +474,23 @@ class GeoFinder:
 
         self.w.root.update_idletasks()
 
+    def display_similar_fixes(self, place: Loc.Loc):
+        """ Add Global Replace entries with keys similar to this place to listbox.  Score column is FIX nn% """
+        geoids = {str(geo_row[GeoUtil.Entry.ID]) for geo_row in place.georow_list}
+        for score, key, entry in self.ngram_index.similar(self.review_key):
+            prefix, geoid = ReplacementDictionary.parse_replacement_entry(entry)
+            if len(geoid) == 0 or geoid in geoids:
+                continue
+            geoids.add(geoid)
+            temp_place = Loc.Loc()
+            self.geodata.find_geoid(geoid, temp_place)
+            if temp_place.result_type != GeoUtil.Result.STRONG_MATCH:
+                continue
+            self.geodata.geo_files.geodb.set_display_names(temp_place)
+            nm = temp_place.get_long_name(self.geodata.geo_files.output_replace_dct)
+            self.logger.debug(f'Similar fix [{key}] score={score:.2f} for [{self.review_key}]')
+            self.w.tree.list_insert(nm, GeoUtil.capwords(prefix), geoid, f'FIX {int(score * 100)}%', temp_place.feature)
+
     def skip_handler(self):
         """ User clicked SKIP.  Write out original entry as-is and skip in future. Go to next place  """
         self.skip_count += 1
@@ -488,6 +534,8 @@ class GeoFinder:
         res = ReplacementDictionary.build_replacement_entry(geoid, prefix)
         ky = Normalize.normalize(text=key, remove_commas=False)
         self.global_replace.set(ky, res)
+        self.variant_index.add(ky)
+        self.ngram_index.add(ky)
 
         # Periodically flush dictionary to disk
         if self.update_counter % 10 == 1:
@@ -748,15 +796,15 @@ class GeoFinder:
         file_list = ['allCountries.txt', 'cities500.txt']
 
         # Get country list and validate
-        countries = CachedDictionary.CachedDictionary(self.cache_dir, 'country_list.pkl')
+        self.supported_countries_cd = SqliteDictionary.SqliteDictionary(self.cache_dir, 'country_list.pkl')
         self.logger.debug('load country selections list')
 
-        err = countries.read()
+        err = self.supported_countries_cd.read()
         if err:
             file_error = True
             return file_error
 
-        country_dct = countries.dict
+        country_dct = self.supported_countries_cd.dict
         if len(country_dct) == 0:
             self.logger.warning('no countries specified')
             file_error = True
@@ -793,10 +841,14 @@ class GeoFinder:
 
     @property
     def get_stats_text(self) -> str:
-        if self.ancestry_file_handler is not None:
+        if self.ancestry_file_handler is not None and self.ancestry_file_handler.place_total > 0:
             remaining = self.ancestry_file_handler.place_total - self.done_count
             return f'Matched={self.matched_count}   Skipped={self.skip_count}  Needed Review={self.review_count} ' \
                 f'Remaining={remaining} Total={self.ancestry_file_handler.place_total}'
+        elif self.ancestry_file_handler is not None:
+            # Place total isn't known until the places have been read
+            return f'Matched={self.matched_count}   Skipped={self.skip_count}  Needed Review={self.review_count} ' \
+                f'Read={self.ancestry_file_handler.percent_complete}%'
         else:
             return ''
 
@@ -814,7 +866,8 @@ class GeoFinder:
         if self.ancestry_file_handler.place_total > 0:
             self.w.prog.update_progress(100 * self.done_count / self.ancestry_file_handler.place_total, " ")
         else:
-            self.w.prog.update_progress(0, " ")
+            # Place total isn't known yet.  Show how much of the file has been read
+            self.w.prog.update_progress(self.ancestry_file_handler.percent_complete, " ")
 
         return self.done_count
 
@@ -830,10 +883,22 @@ class GeoFinder:
             Return geoid of location if found, else None
             place will be filled out with replacement location
         """
-        entry = dct.get(town_entry)
+        key = town_entry
+        entry = dct.get(key)
+        if not entry:
+            # Entry may have been added by another process or archived by compaction
+            entry = dct.get_stored(key)
+        if not entry:
+            # Variant of a stored key - spacing, punctuation, abbreviation or missing county
+            key, entry = self.variant_index.lookup(town_entry)
         if entry:
+            dct.record_hit(key)
+            # Reuse of this result in the next incremental run depends on this entry
+            self.ancestry_file_handler.add_replacement(key, entry)
             place.prefix, geoid = ReplacementDictionary.parse_replacement_entry(entry)
         else:
+            # Result is not reused in the next incremental run if an entry is added for this place
+            self.ancestry_file_handler.add_replacement(town_entry, None)
             return None
 
         if len(geoid) > 0:
@@ -917,20 +982,25 @@ class GeoFinder:
             Error - True if error occurred
         """
         # Read in Skiplist, Replace list
-        self.skiplist = CachedDictionary.CachedDictionary(self.cache_dir, "skiplist.pkl")
+        self.skiplist = SqliteDictionary.SqliteDictionary(self.cache_dir, "skiplist.pkl")
         self.skiplist.read()
-        self.global_replace = CachedDictionary.CachedDictionary(self.cache_dir, "global_replace.pkl")
+        self.skip_matcher = SkipMatcher.SkipMatcher(self.skiplist.dict)
+        self.global_replace = SqliteDictionary.SqliteDictionary(self.cache_dir, "global_replace.pkl")
         self.global_replace.read()
-        dict_copy = copy.copy(self.global_replace.dict)
 
-        # Convert all global_replace items to lowercase
-        for ky in dict_copy:
-            val = self.global_replace.dict.pop(ky)
-            new_key = Normalize.normalize(text=ky, remove_commas=False)
-            self.global_replace.dict[new_key] = val
+        # Normalize global_replace keys and convert entries if stored with a different format version
+        count = ReplacementDictionary.migrate(self.global_replace)
+        if count > 0:
+            self.logger.info(f'Global replace: migrated {count} entries')
+        # Track hit counts for compaction of unused entries
+        self.global_replace.start_run()
+        # Index of key variants for entries that miss the exact lookup
+        self.variant_index = ReplaceIndex.VariantIndex(self.global_replace.dict)
+        # Index to offer similar resolved places during review
+        self.ngram_index = ReplaceIndex.NgramIndex(self.global_replace.dict)
 
         # Read in dictionary listing Geoname features we should include
-        self.feature_code_list_cd = CachedDictionary.CachedDictionary(self.cache_dir, "feature_list.pkl")
+        self.feature_code_list_cd = SqliteDictionary.SqliteDictionary(self.cache_dir, "feature_list.pkl")
         self.feature_code_list_cd.read()
         feature_code_list_dct: Dict[str, str] = self.feature_code_list_cd.dict
         if len(feature_code_list_dct) < 3:
@@ -941,13 +1011,14 @@ class GeoFinder:
                 feature_code_list_dct[feat] = ''
             self.feature_code_list_cd.write()
 
-        # Read in dictionary containing countries (ISO2) we should include
-        self.supported_countries_cd = CachedDictionary.CachedDictionary(self.cache_dir, "country_list.pkl")
-        self.supported_countries_cd.read()
+        # Read in dictionary containing countries (ISO2) we should include.  Already read by check_configuration
+        if self.supported_countries_cd is None:
+            self.supported_countries_cd = SqliteDictionary.SqliteDictionary(self.cache_dir, "country_list.pkl")
+            self.supported_countries_cd.read()
         supported_countries_dct: Dict[str, str] = self.supported_countries_cd.dict
 
         # Read in dictionary containing languages (ISO2) we should include
-        self.languages_list_cd = CachedDictionary.CachedDictionary(self.cache_dir, "languages_list.pkl")
+        self.languages_list_cd = SqliteDictionary.SqliteDictionary(self.cache_dir, "languages_list.pkl")
         self.languages_list_cd.read()
         languages_list_dct: Dict[str, str] = self.languages_list_cd.dict
 
@@ -968,6 +1039,18 @@ class GeoFinder:
         if error:
             TKHelper.fatal_error(MISSING_FILES)
 
+        # If geodata.db was rebuilt, quarantine global replace entries whose GEOID is gone
+        quarantined, restored, report_path = ReplacementDictionary.revalidate_cache(
+            self.cache_dir, self.global_replace, self.geodata.geo_files.geodb.db.conn)
+        # Variant lookup only drops a county if it is named like one or is a known admin2 name
+        self.variant_index.set_county_names(ReplaceIndex.load_county_names(self.geodata.geo_files.geodb.db.conn))
+        if len(quarantined) > 0 or len(restored) > 0:
+            self.logger.warning(f'Global replace: {len(quarantined)} entries quarantined, {len(restored)} restored')
+            messagebox.showinfo('Global Replace',
+                                f'Geoname database has changed.\n\n{len(quarantined)} Global Replace entries are no '
+                                f'longer in the database and were removed.\n{len(restored)} were restored.'
+                                f'\n\nSee {report_path}')
+
         self.w.root.update()
         self.w.prog.update_progress(100, " ")
         return error
@@ -977,6 +1060,11 @@ class GeoFinder:
         parser.add_argument("--logging", help="info - Enable quiet logging")
         parser.add_argument("--diagnostics", help="on - Create xx.input.txt and xx.output.txt diagnostics files")
         parser.add_argument("--spellcheck", help="on - Enable spellchecker")
+        parser.add_argument("--incremental", help="on - Reuse output for GEDCOM records and Gramps places unchanged since last run")
+        parser.add_argument("--compress", help="on - Write GZIP compressed output file")
+        parser.add_argument("--hierarchy", help="on - Resolve Gramps places after their enclosing places (placeref)")
+        parser.add_argument("--csvmaxrows", type=int, default=0,
+                            help="N - Keep at most N Gramps CSV rows in memory per level, store the rest on disk")
 
         # read arguments from the command line
         args = parser.parse_args()
@@ -1001,6 +1089,32 @@ class GeoFinder:
         else:
             self.enable_spell_checker = False
 
+        # check for --incremental switch
+        if args.incremental == 'on':
+            self.logger.info(f"--incremental enabled {args.incremental}")
+            self.incremental = True
+        else:
+            self.incremental = False
+
+        # check for --compress switch
+        if args.compress == 'on':
+            self.logger.info(f"--compress output enabled {args.compress}")
+            self.compress = True
+        else:
+            self.compress = False
+
+        # check for --hierarchy switch
+        if args.hierarchy == 'on':
+            self.logger.info(f"--hierarchy enabled {args.hierarchy}")
+            self.hierarchy = True
+        else:
+            self.hierarchy = False
+
+        # check for --csvmaxrows
+        self.csv_max_rows = args.csvmaxrows
+        if self.csv_max_rows > 0:
+            self.logger.info(f"--csvmaxrows {args.csvmaxrows}")
+
     result_text_list = {
         GeoUtil.Result.STRONG_MATCH: 'Matched! Click Save to accept:',
         GeoUtil.Result.MULTIPLE_MATCHES: ' Multiple matches.  Select one and click Verify or Double-Click',
@@ -23,20 +23,53 @@ import re
 
 from geodata import Loc
 from geodata import Geodata
+from geofinder.util import AdminNames, SpillDictionary
 
 
-class CSVEntry:
-    PLACE_ID = 0
-    TITLE = 1
-    NAME = 2
-    LAT = 3
-    LON = 4
-    FEAT = 5
-    ADMIN1_ID = 6
-    ADMIN2_ID = 7
-    ISO = 8
-    ENCLOSED_BY = 9
-    TYPE = 10
+CSV_BUFFER_SIZE = 1024 * 1024
+
+
+class CsvRow:
+    """
+    One CSV node.  Title and name are kept as found (enclosures are looked up from the title) and are put in
+    Title Case when the row is written.  Lat/lon are floats
+    """
+    __slots__ = ('place_id', 'title', 'name', 'lat', 'lon', 'feat', 'admin1_id', 'admin2_id', 'iso',
+                 'enclosed_by', 'place_type')
+
+    def __init__(self, place_id: str, title: str, name: str, lat: float, lon: float, feat: str, admin1_id: str,
+                 admin2_id: str, iso: str, enclosed_by: str, place_type: str):
+        self.place_id = place_id
+        self.title = title
+        self.name = name
+        self.lat = lat
+        self.lon = lon
+        self.feat = feat
+        self.admin1_id = admin1_id
+        self.admin2_id = admin2_id
+        self.iso = iso
+        self.enclosed_by = enclosed_by
+        self.place_type = place_type
+
+    def __getstate__(self):
+        # Rows are pickled in the place cache.  Slots classes have no __dict__
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def csv_line(self) -> str:
+        """ CSV line with Place (ID), Title, Name, Type, latitude, longitude, enclosed_by """
+        if self.enclosed_by != '':
+            enc = f'[{self.enclosed_by}]'
+        else:
+            enc = ''
+        title = capwords(self.title).replace('"', '""')
+        name = capwords(self.name).replace('"', '""')
+        if math.isnan(self.lat) or math.isnan(self.lon):
+            return f'[{self.place_id}],"{title}","{name}",{self.place_type}, , ,{enc},\n'
+        return f'[{self.place_id}],"{title}","{name}",{self.place_type},{self.lat:.4f},{self.lon:.4f},{enc},\n'
 
 
 class GrampsCsv:
@@ -48,23 +81,37 @@ class GrampsCsv:
     Then call write_csv_file().   This will write out a CSV file
     """
 
-    def __init__(self, in_path: str, geodata: Geodata):
+    def __init__(self, in_path: str, geodata: Geodata, max_rows: int = 0):
         """
         #Args:
             in_path: This will write to in_path with .CSV appended
             geodata: geodata.Geodata
+            max_rows: If not zero, maximum rows kept in memory for each hierarchy level.  Additional rows
+                are stored in a temporary database on disk
         """
         self.logger = logging.getLogger(__name__)
         self.geodata = geodata
 
         # There is a separate dictionary for each hierarchy (prefix, city, adm2, adm1, country)
-        self.hierarchy_dictionaries = [{}, {}, {}, {}, {}]
+        if max_rows > 0:
+            self.hierarchy_dictionaries = [SpillDictionary.SpillDictionary(max_rows) for _ in range(5)]
+        else:
+            self.hierarchy_dictionaries = [{}, {}, {}, {}, {}]
+
+        # Enclosure ID for each enclosure already resolved.  Key is (place type, enclosure part of hierarchy key)
+        self.enclosure_cache = {}
+
+        # Admin2 ID found by wide search.  Key is (admin2_name, admin1_id, country_iso)
+        self.admin2_id_cache = {}
+
+        # Country, admin1 and admin2 name tables.  Loaded when enclosures are created
+        self.admin_names = None
 
         self.csvfile = None
 
         if in_path is not None:
             csv_path = in_path + '.' + 'csv'
-            self.csvfile = open(csv_path, "w", encoding='utf-8')
+            self.csvfile = open(csv_path, "w", encoding='utf-8', buffering=CSV_BUFFER_SIZE)
             self.logger.debug(f'CSV file {csv_path}')
 
     def write_asis(self, entry: str):
@@ -78,11 +125,12 @@ class GrampsCsv:
         Call create_csv_node for each place in the ancestry file
         #Args:
             place: Loc.Loc location
+        #Returns:
+            (dict_idx, key, csv_row) for the node.  This can be passed to add_row() in a later run.  None if no node
         """
         if place.original_entry == '':
-            return
+            return None
 
-        csv_row = [''] * 11
         _set_CSV_place_type(place)
 
         if place.id == '':
@@ -91,17 +139,10 @@ class GrampsCsv:
 
         place.set_place_type_text()
 
-        csv_row[CSVEntry.PLACE_ID] = place.id
-        csv_row[CSVEntry.ENCLOSED_BY] = place.enclosed_by
-        csv_row[CSVEntry.TITLE] = place.prefix + place.prefix_commas + place.original_entry
-        csv_row[CSVEntry.FEAT] = place.feature
-        csv_row[CSVEntry.LAT] = f'{float(place.lat):.4f}'
-        csv_row[CSVEntry.LON] = f'{float(place.lon):.4f}'
-        csv_row[CSVEntry.ADMIN2_ID] = place.admin2_id
-        csv_row[CSVEntry.ADMIN1_ID] = place.admin1_id
-        csv_row[CSVEntry.ISO] = place.country_iso
-        csv_row[CSVEntry.NAME] = _get_csv_name(place)
-        csv_row[CSVEntry.TYPE] = place.result_type_text
+        csv_row = CsvRow(place_id=place.id, title=place.prefix + place.prefix_commas + place.original_entry,
+                         name=_get_csv_name(place), lat=float(place.lat), lon=float(place.lon),
+                         feat=place.feature, admin1_id=place.admin1_id, admin2_id=place.admin2_id,
+                         iso=place.country_iso, enclosed_by=place.enclosed_by, place_type=place.result_type_text)
 
         #  There is a separate dictionary for each entity tier (prefix, city, adm2, adm1, country)
         key = self._get_hierarchy_key(place)
@@ -110,41 +151,66 @@ class GrampsCsv:
         if dict_idx == 0:
             # This node is at country level - so no enclosure
             place.enclosed_by = ''
-            csv_row[CSVEntry.ENCLOSED_BY] = ''
+            csv_row.enclosed_by = ''
 
         if place.enclosed_by != '':
             # Validate enclosure
-            if hierarchy_level(key) <= hierarchy_level(csv_row[CSVEntry.ENCLOSED_BY]) and hierarchy_level(key) > 0:
-                msg = f'Incorrect Enclosure for [{place.original_entry}]. Key= [{key}] Enclosure= [{csv_row[CSVEntry.ENCLOSED_BY]}]'
+            if hierarchy_level(key) <= hierarchy_level(csv_row.enclosed_by) and hierarchy_level(key) > 0:
+                msg = f'Incorrect Enclosure for [{place.original_entry}]. Key= [{key}] Enclosure= [{csv_row.enclosed_by}]'
                 self.logger.warning(msg)
-            elif hierarchy_level(key) < hierarchy_level(csv_row[CSVEntry.ENCLOSED_BY]) and hierarchy_level(key) == 0:
-                msg = f'Incorrect Enclosure for [{place.original_entry}]. Key= [{key}] Enclosure= [{csv_row[CSVEntry.ENCLOSED_BY]}]'
+            elif hierarchy_level(key) < hierarchy_level(csv_row.enclosed_by) and hierarchy_level(key) == 0:
+                msg = f'Incorrect Enclosure for [{place.original_entry}]. Key= [{key}] Enclosure= [{csv_row.enclosed_by}]'
                 self.logger.warning(msg)
 
+        saved_row = copy.copy(csv_row)
+        place.id = self.add_row(dict_idx, key, csv_row)
+
+        # self.logger.debug(f'\nCREATE CSV NODE {key.upper()} idx={dict_idx}: {row}\n{place.formatted_name}')
+        return dict_idx, key, saved_row
+
+    def add_row(self, dict_idx: int, key: str, csv_row: CsvRow) -> str:
+        """
+        Add a CSV node to Dictionary.  Used by add_place() and to add a node saved from a previous run
+        #Args:
+            dict_idx: Dictionary index (place type)
+            key: Hierarchy key (upper case)
+            csv_row: CSV row
+        #Returns:
+            Place ID for node
+        """
+        place_id = csv_row.place_id
+
         # See if this is a synthetic ID or Ancestry ID
-        if '_' in place.id or len(place.id)<4:
+        if '_' in place_id or len(place_id)<4:
             # Synthetic ID.  We created this place ID.  It has no ancestry events tied to it and is lower priority
             # than an Ancestry place ID (which has events).  Only add it if we don't already have an Ancestry Place ID
-            res = self.hierarchy_dictionaries[dict_idx].get(key.upper())
+            res = self.hierarchy_dictionaries[dict_idx].get(key)
             if res is None:
                 # Nothing there, add this row
-                self.hierarchy_dictionaries[dict_idx][key.upper()] = csv_row
+                self.hierarchy_dictionaries[dict_idx][key] = csv_row
             else:
                 # An ancestry node is already there so use existing
-                place.id = res[CSVEntry.PLACE_ID]
+                place_id = res.place_id
         else:
             # Place ID came from the Ancestry data and takes priority since it is already linked to
             # events.  Add this
-            self.hierarchy_dictionaries[dict_idx][key.upper()] = csv_row
-
-        # self.logger.debug(f'\nCREATE CSV NODE {key.upper()} idx={dict_idx}: {row}\n{place.formatted_name}')
+            self.hierarchy_dictionaries[dict_idx][key] = csv_row
+        return place_id
 
-    def create_enclosures(self):
+    def create_enclosures(self, progress=None):
         """
         Walk through all entries and create any missing enclosure items
+        #Args:
+            progress: Optional function called with percent complete
         """
         self.logger.debug('\n\n******** DONE \n  CREATE CSV ENCLOSURES *********')
         place = Loc.Loc()
+        if self.admin_names is None:
+            self.admin_names = AdminNames.AdminNames(self.geodata.geo_files.geodb,
+                                                     list(self.geodata.geo_files.supported_countries_dct))
+            self.admin_names.load()
+        total = sum([len(dictionary) for dictionary in self.hierarchy_dictionaries])
+        count = 0
 
         # Create any missing enclosure records
         # There are separate dictionaries for each tier (prefix, city, county, country).
@@ -152,11 +218,15 @@ class GrampsCsv:
         for idx, dictionary in reversed(list(enumerate(self.hierarchy_dictionaries))):
             self.logger.debug(f'===TABLE {idx}===')
             for key in dictionary:
-                _retrieve_csv_place(self.hierarchy_dictionaries, self.geodata, place, key, idx)
+                _retrieve_csv_place(self.hierarchy_dictionaries, self.admin_names, place, key, idx)
                 self.logger.debug(f'** CSV {key} {place.original_entry}')
 
                 # Create enclosure for each node at this level
-                self._create_enclosed_by(place)
+                self._create_enclosed_by(place, key)
+
+                count += 1
+                if progress is not None and count % 100 == 0:
+                    progress(min(int(count * 100 / total), 99))
 
     def write_csv_file(self):
         """
@@ -172,31 +242,55 @@ class GrampsCsv:
                 for key in dictionary:
                     row = dictionary[key]
                     # self.logger.debug(f'IDX={idx} {key} : {row}')
-                    self._output_row(row)
+                    self.csvfile.write(row.csv_line())
 
             self.csvfile.close()
 
-    def _create_enclosed_by(self, place: Loc.Loc):
+        for dictionary in self.hierarchy_dictionaries:
+            if isinstance(dictionary, SpillDictionary.SpillDictionary):
+                dictionary.close()
+
+    def _create_enclosed_by(self, place: Loc.Loc, key: str):
         """
-        Create EnclosedBy elements in Dictionary for CSV file
-        :return: None
+        Create EnclosedBy elements in Dictionary for CSV file.  Places that share the same enclosure
+        (e.g. cities in the same county) only resolve it once
+        #Args:
+            place: Place to create enclosure for
+            key: Hierarchy key for place
         """
         self.logger.debug(f'\nCREATE ENCLOSURE FOR {place.original_entry}')
-        enclosure_place: Loc.Loc = copy.copy(place)
-        enclosure_place.id = ''
+        # Hierarchy key without the first segment identifies the enclosure
+        cache_key = (_get_dict_idx(place), key.partition('_')[2])
+        if any(segment.strip(' ') == '' for segment in cache_key[1].split('_')):
+            # Admin2 ID is blank so the key doesn't identify the county.  Include the admin2 name
+            cache_key += (place.admin2_name.upper(),)
+        if cache_key in self.enclosure_cache:
+            enclosure_id = self.enclosure_cache[cache_key]
+        else:
+            enclosure_place: Loc.Loc = copy.copy(place)
+            enclosure_place.id = ''
 
-        # Move up to enclosure level
-        success = self._move_up_level(enclosure_place=enclosure_place, idx=_get_dict_idx(enclosure_place))
-        if success:
-            place.enclosed_by = enclosure_place.id
+            # Move up to enclosure level
+            success = self._move_up_level(enclosure_place=enclosure_place, idx=_get_dict_idx(enclosure_place))
+            enclosure_id = enclosure_place.id if success else None
+            self.enclosure_cache[cache_key] = enclosure_id
+
+        if enclosure_id is not None:
+            place.enclosed_by = enclosure_id
             self._update_enclosure_id(place)
         return
 
     def _get_hierarchy_key(self, place):
         # Create key of format:  prefix_city_adm2ID_adm1ID_ISO    Any segments missing are left out.
         if place.admin2_id == '':
-            self.logger.warning(f'{place.original_entry} admin2_id blank')
-            self.geodata.geo_files.geodb.wide_search_admin2_id(place)
+            # Back-fill admin2 ID.  Search each admin2 name once
+            cache_key = (place.admin2_name, place.admin1_id, place.country_iso)
+            if cache_key in self.admin2_id_cache:
+                place.admin2_id = self.admin2_id_cache[cache_key]
+            else:
+                self.logger.warning(f'{place.original_entry} admin2_id blank')
+                self.geodata.geo_files.geodb.wide_search_admin2_id(place)
+                self.admin2_id_cache[cache_key] = place.admin2_id
         if place.admin2_id == '' and len(place.admin2_name.strip(' ')) > 0:
             place.admin2_id = ' '
         if place.place_type == Loc.PlaceType.COUNTRY:
@@ -270,34 +364,18 @@ class GrampsCsv:
     def _update_enclosure_id(self, place):
         key = self._get_hierarchy_key(place)
         dict_idx = _get_dict_idx(place)
-        row = self.hierarchy_dictionaries[dict_idx].get(key.upper())
+        row = self.hierarchy_dictionaries[dict_idx].get(key)
         if row:
-            if not re.match(r'P\d\d\d\d', row[CSVEntry.ENCLOSED_BY]):
-                row[CSVEntry.ENCLOSED_BY] = place.enclosed_by
-                self.hierarchy_dictionaries[dict_idx][key.upper()] = row
+            if not re.match(r'P\d\d\d\d', row.enclosed_by):
+                row.enclosed_by = place.enclosed_by
+                # Store row again in case the dictionary keeps it on disk
+                self.hierarchy_dictionaries[dict_idx][key] = row
                 self.logger.debug(f'UPDATE ENC for {dict_idx}:{key} New Enclosure=[{place.enclosed_by}]')
             else:
                 pass
         else:
             self.logger.warning(f'@@@@@@@@ Cant find row {key}')
 
-    def _output_row(self, row):
-        if len(row[CSVEntry.ENCLOSED_BY]) > 0:
-            enc = f'[{row[CSVEntry.ENCLOSED_BY]}]'
-        else:
-            enc = ''
-        if self.csvfile is not None:
-            # 0Place (ID), 1Title, 2Name, 3Type, 4latitude, 5longitude, 6enclosed_by
-            title = capwords(row[CSVEntry.TITLE])
-            name = capwords(row[CSVEntry.NAME])
-
-            if math.isnan(float(row[CSVEntry.LAT])) or math.isnan(float(row[CSVEntry.LAT])):
-                self.csvfile.write(f'[{row[CSVEntry.PLACE_ID]}],"{title}","{name}",{row[CSVEntry.TYPE]},'
-                                   f' , ,{enc},\n')
-            else:
-                self.csvfile.write(f'[{row[CSVEntry.PLACE_ID]}],"{title}","{name}",{row[CSVEntry.TYPE]},'
-                                   f'{row[CSVEntry.LAT]},{row[CSVEntry.LON]},{enc},\n')
-
 
 def _set_CSV_place_type(place: Loc.Loc):
     place.set_place_type()
@@ -323,12 +401,12 @@ def _get_csv_name(place):
     return nm
 
 
-def _retrieve_csv_place(hierarchy_dictionaries, geodata, place: Loc.Loc, key, idx):
+def _retrieve_csv_place(hierarchy_dictionaries, admin_names, place: Loc.Loc, key, idx):
     """
     Lookup key in dictionary and fill in place with data from dictionary entry
     #Args:
         hierarchy_dictionaries:
-        geodata:
+        admin_names: AdminNames tables
         place:
         key:
         idx:
@@ -341,20 +419,20 @@ def _retrieve_csv_place(hierarchy_dictionaries, geodata, place: Loc.Loc, key, id
     key_tokens = key.split("_")
     place.place_type = len(key_tokens) - 1
     # self.logger.debug(f'{row}')
-    place.feature = row[CSVEntry.FEAT]
+    place.feature = row.feat
 
-    place.original_entry = row[CSVEntry.TITLE]
-    place.country_iso = row[CSVEntry.ISO]
-    place.country_name = geodata.geo_files.geodb.get_country_name(place.country_iso)
-    place.enclosed_by = row[CSVEntry.ENCLOSED_BY]
+    place.original_entry = row.title
+    place.country_iso = row.iso
+    place.country_name = admin_names.get_country_name(place.country_iso)
+    place.enclosed_by = row.enclosed_by
 
-    place.lat: float = float(row[CSVEntry.LAT])
-    place.lon: float = float(row[CSVEntry.LON])
+    place.lat: float = row.lat
+    place.lon: float = row.lon
 
-    place.admin2_id = row[CSVEntry.ADMIN2_ID]
-    place.admin1_id = row[CSVEntry.ADMIN1_ID]
-    place.admin1_name = str(geodata.geo_files.geodb.get_admin1_name(place))
-    place.admin2_name = str(geodata.geo_files.geodb.get_admin2_name(place))
+    place.admin2_id = row.admin2_id
+    place.admin1_id = row.admin1_id
+    place.admin1_name = str(admin_names.get_admin1_name(place))
+    place.admin2_name = str(admin_names.get_admin2_name(place))
     if place.admin2_name is None:
         place.admin2_name = ''
     if place.admin1_name is None:
@@ -366,7 +444,7 @@ def _retrieve_csv_place(hierarchy_dictionaries, geodata, place: Loc.Loc, key, id
     if len(tokens) > 4:
         place.prefix = tokens[-5]
 
-    place.id = row[CSVEntry.PLACE_ID]
+    place.id = row.place_id
 
 
 def hierarchy_level(key):
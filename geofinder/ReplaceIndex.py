@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+import logging
+import re
+from array import array
+from collections import Counter
+from typing import Dict, List, Set, Tuple, Union
+
+from geodata import Normalize
+
+from geofinder import ReplacementDictionary
+
+# Abbreviations that are expanded in canonical keys
+ABBREVIATIONS = {'co': 'county', 'cnty': 'county', 'twp': 'township', 'tp': 'township', 'par': 'parish',
+                 'mt': 'mount', 'ft': 'fort'}
+PUNCTUATION = re.compile(r"[^a-z0-9, ]+")
+# Minimum number of parts for a key to have a county:  town, county, state, country
+COUNTY_PARTS = 4
+# A part that ends with one of these is a county.  Other parts are only a county if they are an admin2 name
+COUNTY_SUFFIXES = ('county', 'parish', 'shire', 'borough')
+NGRAM_SIZE = 3
+# N-grams in more keys than this (e.g. 'usa') are too common to select candidates
+MAX_POSTINGS = 2000
+MIN_SELECTIVE = 2
+# Number of candidates that get an exact similarity score
+MAX_CANDIDATES = 50
+
+
+def canonical(key: str) -> str:
+    """
+    Canonical form of a normalized key:  spacing and punctuation removed, abbreviations expanded.
+        'kent co , england' and 'kent county,england' both become 'kent county, england'
+    """
+    parts = []
+    for part in PUNCTUATION.sub(' ', key).split(','):
+        words = part.split()
+        if len(words) > 0:
+            parts.append(' '.join([ABBREVIATIONS.get(word, word) for word in words]))
+    return ', '.join(parts)
+
+
+def drop_county(key: str, county_names: Set[str] = frozenset()) -> Union[str, None]:
+    """
+    Canonical key without the county part (third from the end)
+    #Args:
+        key: Canonical key
+        county_names: Canonical admin2 names
+    #Returns:
+        Key without county.  None if key is too short to have a county or the third part from the end doesn't look
+        like a county (e.g. prefix, town, state, country)
+    """
+    parts = key.split(', ')
+    if len(parts) < COUNTY_PARTS:
+        return None
+    if not parts[-3].endswith(COUNTY_SUFFIXES) and parts[-3] not in county_names:
+        return None
+    del parts[-3]
+    return ', '.join(parts)
+
+
+def load_county_names(geodb_conn) -> Set[str]:
+    """ Canonical names of all admin2 entries in geodata.db """
+    rows = geodb_conn.execute("SELECT DISTINCT name FROM main.geodata WHERE f_code = 'ADM2'").fetchall()
+    return {canonical(Normalize.normalize(text=name, remove_commas=True)) for name, in rows}
+
+
+class VariantIndex:
+    """
+    Secondary index over global replace keys for entries that miss the exact lookup because of spacing,
+    punctuation, an abbreviation (Co. vs County) or a missing county.  Maps canonical key variants back to
+    the stored keys.  The index is built on the first lookup.
+
+    A variant only matches if all the stored keys it maps to have the same replacement.  DELETE entries
+    (no GEOID) never match a variant.  A missing county
+    matches in either direction (stored key or lookup has it) but two different counties never match.
+    The part that is dropped must end with county, parish, shire or borough, or be an admin2 name from
+    set_county_names(), so a town in a prefix, town, state, country key is never dropped.
+    """
+
+    def __init__(self, dct: Dict):
+        """
+        #Args:
+            dct: Global replace dictionary.  Entries are read from it at lookup time
+        """
+        self.logger = logging.getLogger(__name__)
+        self.dct = dct
+        self.full_index: Dict[str, List[str]] = {}     # canonical key -> stored keys
+        self.reduced_index: Dict[str, List[str]] = {}  # canonical key without county -> stored keys
+        self.county_names: Set[str] = frozenset()
+        self.built = False
+
+    def set_county_names(self, county_names: Set[str]):
+        """ Admin2 names that can be dropped as a county.  Index is rebuilt on next lookup """
+        self.county_names = county_names
+        self.built = False
+
+    def build(self):
+        self.full_index.clear()
+        self.reduced_index.clear()
+        for key in self.dct:
+            self._add(key)
+        self.built = True
+        self.logger.debug(f'Variant index: {len(self.full_index)} keys, {len(self.reduced_index)} without county')
+
+    def add(self, key: str):
+        """ Add a new global replace key """
+        if self.built:
+            self._add(key)
+
+    def _add(self, key: str):
+        canon = canonical(key)
+        self.full_index.setdefault(canon, []).append(key)
+        reduced = drop_county(canon, self.county_names)
+        if reduced is not None:
+            self.reduced_index.setdefault(reduced, []).append(key)
+
+    def lookup(self, key: str) -> (Union[str, None], object):
+        """
+        Find a global replace entry for a variant of key.  Call after the exact lookup misses
+        #Args:
+            key: Normalized place text
+        #Returns:
+            (stored key, entry) or (None, None) if there is no unambiguous match
+        """
+        if not self.built:
+            self.build()
+        canon = canonical(key)
+        # Same canonical key, or lookup is missing the county of a stored key
+        candidates = self.full_index.get(canon, []) + self.reduced_index.get(canon, [])
+        reduced = drop_county(canon, self.county_names)
+        if reduced is not None:
+            # Stored key is missing the county of the lookup
+            candidates += self.full_index.get(reduced, [])
+
+        match_key = None
+        match_entry = None
+        for stored_key in candidates:
+            entry = self.dct.get(stored_key)
+            if entry is None:
+                # Removed since index was built
+                continue
+            if len(ReplacementDictionary.parse_replacement_entry(entry)[1]) == 0:
+                # DELETE entries only apply to the exact key
+                continue
+            if match_key is not None and entry != match_entry:
+                self.logger.debug(f'Variant [{key}] is ambiguous: [{match_key}] [{stored_key}]')
+                return None, None
+            match_key, match_entry = stored_key, entry
+        return match_key, match_entry
+
+
+def ngrams(text: str, size: int = NGRAM_SIZE) -> set:
+    """ Set of character n-grams of canonical text.  Padded so the start and end of words count """
+    text = f' {canonical(text).replace(",", "")} '
+    return {text[idx:idx + size] for idx in range(len(text) - size + 1)}
+
+
+class NgramIndex:
+    """
+    In-memory character trigram index over global replace keys to find resolved keys that are similar to a place
+    that missed, e.g. a typo variant.  Similarity is the Dice coefficient of the trigram sets.
+    Candidates are selected with the trigrams that are in at most MAX_POSTINGS keys, then the best MAX_CANDIDATES
+    are scored exactly.  The index is built on the first lookup.
+    """
+
+    def __init__(self, dct: Dict):
+        """
+        #Args:
+            dct: Global replace dictionary.  Entries are read from it at lookup time
+        """
+        self.logger = logging.getLogger(__name__)
+        self.dct = dct
+        self.keys: List[str] = []
+        self.postings: Dict[str, array] = {}  # n-gram -> key numbers
+        self.built = False
+
+    def build(self):
+        self.keys = []
+        self.postings = {}
+        for key in self.dct:
+            self._add(key)
+        self.built = True
+        self.logger.debug(f'N-gram index: {len(self.keys)} keys, {len(self.postings)} n-grams')
+
+    def add(self, key: str):
+        """ Add a new global replace key """
+        if self.built:
+            self._add(key)
+
+    def _add(self, key: str):
+        key_num = len(self.keys)
+        self.keys.append(key)
+        for gram in ngrams(key):
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = self.postings[gram] = array('i')
+            posting.append(key_num)
+
+    def similar(self, key: str, count: int = 5, min_score: float = 0.6) -> List[Tuple[float, str, object]]:
+        """
+        Find the resolved keys that are most similar to key
+        #Args:
+            key: Normalized place text
+            count: Maximum number of results
+            min_score: Minimum similarity (0 to 1)
+        #Returns:
+            List of (score, stored key, entry), best first
+        """
+        if not self.built:
+            self.build()
+        grams = ngrams(key)
+        if len(grams) == 0:
+            return []
+
+        # Count shared selective n-grams for each key.  If there are too few, use the least common ones
+        postings = sorted([self.postings[gram] for gram in grams if gram in self.postings], key=len)
+        selective = [posting for posting in postings if len(posting) <= MAX_POSTINGS]
+        if len(selective) < MIN_SELECTIVE:
+            selective = postings[:MIN_SELECTIVE]
+        shared = Counter()
+        for posting in selective:
+            shared.update(posting)
+
+        results = []
+        for key_num, _ in shared.most_common(MAX_CANDIDATES):
+            stored_key = self.keys[key_num]
+            entry = self.dct.get(stored_key)
+            if stored_key == key or entry is None:
+                continue
+            stored_grams = ngrams(stored_key)
+            score = 2 * len(grams & stored_grams) / (len(grams) + len(stored_grams))
+            if score >= min_score:
+                results.append((score, stored_key, entry))
+        results.sort(key=lambda result: result[0], reverse=True)
+        return results[:count]
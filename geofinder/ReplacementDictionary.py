@@ -18,9 +18,25 @@
 #   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
 
 
+import os
+
+from geodata import Normalize
+from geodata import __version__ as geodata_version
+from geofinder.util import GeoidCheck, SqliteDictionary
+
 GEOID_TOKEN = 1
 PREFIX_TOKEN = 2
 
+# Version of key normalization and entry format.  Change this when either changes
+FORMAT_VERSION = 2
+VERSION_KEY = 'format_version'
+# Identifies the geodata.db that entries were last validated against
+GEODB_STAMP_KEY = 'geodb_stamp'
+# Entries whose GEOID is no longer in geodata.db
+QUARANTINE_FILE = 'replace_quarantine.pkl'
+QUARANTINE_REPORT = 'replace_quarantine.txt'
+
+
 def build_replacement_entry(geoid, prefix):
     """
     Build replacement dictionary entry
@@ -28,20 +44,23 @@ def build_replacement_entry(geoid, prefix):
         geoid: 
         prefix: 
     Returns:
-
+        (geoid, prefix) tuple
     """
-    return '@' + geoid + '@' + prefix
+    return geoid, prefix
 
 def parse_replacement_entry(entry) -> (str, str):
     """
     Parse replacement dictionary entry.  
     Args:
-        entry: replacement dictionary entry
+        entry: replacement dictionary entry.  (geoid, prefix) tuple or legacy @GEOID@PREFIX string
 
     Returns:
-
+        prefix, geoid
     """
-    # Format is  @GEOID@PREFIX
+    if isinstance(entry, tuple):
+        return entry[1], entry[0]
+
+    # Legacy format is  @GEOID@PREFIX
     if entry is None:
         return '',''
     else:
@@ -57,3 +76,147 @@ def parse_replacement_entry(entry) -> (str, str):
             prefix = ''
     
         return prefix, geoid
+
+def get_format_version() -> str:
+    """ Format version combined with geodata version (Normalize comes from geodata) """
+    return f'{FORMAT_VERSION}-{geodata_version.__version__}'
+
+def migrate(replace_cd) -> int:
+    """
+    Normalize keys and convert entries to (geoid, prefix) tuples if the dictionary was stored with a different
+    format version.  Nothing is done if the version is current.
+    Args:
+        replace_cd: Global replace SqliteDictionary (after read)
+
+    Returns:
+        Number of entries migrated
+    """
+    version = get_format_version()
+    if replace_cd.get_meta(VERSION_KEY) == version:
+        return 0
+
+    dct = replace_cd.dict
+    count = 0
+    for ky in list(dct):
+        val = dct[ky]
+        new_key = Normalize.normalize(text=ky, remove_commas=False)
+        prefix, geoid = parse_replacement_entry(val)
+        new_val = build_replacement_entry(geoid, prefix)
+        if new_key != ky:
+            dct.pop(ky)
+            dct[new_key] = new_val
+            count += 1
+        elif new_val != val:
+            dct[ky] = new_val
+            count += 1
+
+    replace_cd.write()
+    replace_cd.set_meta(VERSION_KEY, version)
+    return count
+
+
+def get_geodb_stamp(geodb_conn) -> str:
+    """ Identify geodata.db build:  file inode and highest row ids.  Changes when the database is rebuilt """
+    path = geodb_conn.execute("SELECT file FROM pragma_database_list WHERE name = 'main'").fetchone()[0]
+    inode = os.stat(path).st_ino if path and os.path.exists(path) else 0
+    geodata_max = geodb_conn.execute('SELECT MAX(rowid) FROM main.geodata').fetchone()[0]
+    admin_max = geodb_conn.execute('SELECT MAX(rowid) FROM main.admin').fetchone()[0]
+    return f'{inode}-{geodata_max}-{admin_max}'
+
+
+def get_record_stamp(geodb_conn) -> str:
+    """ Stamp for saved ancestry output:  global replace format and geodata.db build """
+    return f'{get_format_version()}:{get_geodb_stamp(geodb_conn)}'
+
+
+def replacements_unchanged(replace_cd, replacements) -> bool:
+    """
+    Check that global replace lookups made for a previous result would give the same entry now
+    #Args:
+        replace_cd: Global replace dictionary
+        replacements: (key, entry) pairs.  Entry is None if there was no entry for the key
+    #Returns:
+        True if every key still has the same entry.  Entries that were archived count as changed
+    """
+    dct = replace_cd.dict
+    for key, entry in replacements:
+        if dct.get(key) != entry:
+            return False
+    return True
+
+
+def revalidate(replace_cd, quarantine_cd, geodb_conn, force: bool = False) -> (list, list):
+    """
+    Check every GEOID in global replace against geodata.db after it was rebuilt.  GEOIDs are checked in batches.
+    Entries with a GEOID that is no longer in the database are moved to the quarantine dictionary.  Quarantined
+    entries whose GEOID is back (e.g. country added again) are restored.  Nothing is done if the database is
+    the same one that was last validated, unless force is True.
+    Args:
+        replace_cd: Global replace SqliteDictionary (after read)
+        quarantine_cd: Quarantine SqliteDictionary (after read)
+        geodb_conn: sqlite3 connection to geodata.db
+        force: If True, check even if database is unchanged
+
+    Returns:
+        (quarantined, restored) - lists of (key, geoid)
+    """
+    stamp = get_geodb_stamp(geodb_conn)
+    if not force and replace_cd.get_meta(GEODB_STAMP_KEY) == stamp:
+        return [], []
+
+    # Key -> GEOID for each dictionary
+    replace_geoids = {key: parse_replacement_entry(val)[1] for key, val in replace_cd.dict.items()}
+    quarantine_geoids = {key: parse_replacement_entry(val)[1] for key, val in quarantine_cd.dict.items()}
+    missing = GeoidCheck.find_missing(geodb_conn, set(replace_geoids.values()) | set(quarantine_geoids.values()))
+
+    quarantined = []
+    for key, geoid in replace_geoids.items():
+        if geoid in missing:
+            quarantine_cd.dict[key] = replace_cd.dict.pop(key)
+            quarantined.append((key, geoid))
+    restored = []
+    for key, geoid in quarantine_geoids.items():
+        if key in replace_geoids:
+            # Global replace has a newer entry for this key.  Drop the old one unless newer one was just quarantined
+            if replace_cd.get(key) is not None:
+                quarantine_cd.dict.pop(key)
+        elif geoid not in missing:
+            replace_cd.dict[key] = quarantine_cd.dict.pop(key)
+            restored.append((key, geoid))
+
+    replace_cd.write()
+    quarantine_cd.write()
+    replace_cd.set_meta(GEODB_STAMP_KEY, stamp)
+    return quarantined, restored
+
+
+def write_quarantine_report(path: str, quarantined: list, restored: list):
+    """ Write report of quarantined and restored entries.  One tab separated line per entry """
+    with open(path, 'w', encoding='utf-8') as file:
+        for key, geoid in quarantined:
+            file.write(f'QUARANTINED\t{key}\t{geoid}\n')
+        for key, geoid in restored:
+            file.write(f'RESTORED\t{key}\t{geoid}\n')
+
+
+def revalidate_cache(cache_dir: str, replace_cd, geodb_conn, force: bool = False) -> (list, list, str):
+    """
+    Revalidate global replace against geodata.db using the quarantine dictionary in cache_dir.
+    If anything changed, a report is written to replace_quarantine.txt in cache_dir
+    Args:
+        cache_dir: Cache directory
+        replace_cd: Global replace SqliteDictionary (after read)
+        geodb_conn: sqlite3 connection to geodata.db
+        force: If True, check even if database is unchanged
+
+    Returns:
+        (quarantined, restored, report path)
+    """
+    quarantine_cd = SqliteDictionary.SqliteDictionary(cache_dir, QUARANTINE_FILE)
+    quarantine_cd.read()
+    quarantined, restored = revalidate(replace_cd, quarantine_cd, geodb_conn, force)
+    quarantine_cd.close()
+    path = os.path.join(cache_dir, QUARANTINE_REPORT)
+    if quarantined or restored:
+        write_quarantine_report(path, quarantined, restored)
+    return quarantined, restored, path
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+import fnmatch
+import logging
+import re
+from typing import Union
+
+REGEX_PREFIX = 're:'
+GLOB_PREFIX = 'glob:'
+
+
+def is_pattern(key: str) -> bool:
+    """
+    Skiplist keys starting with re: are regular expressions and keys starting with glob: are glob patterns.
+    All other keys are exact place names, even if they contain * or ?
+    """
+    return key.startswith(REGEX_PREFIX) or key.startswith(GLOB_PREFIX)
+
+
+def compile_pattern(key: str) -> Union[str, None]:
+    """
+    Convert skiplist pattern to regular expression text
+    #Args:
+        key: Skiplist key.  re:<regex> or glob:<pattern>, e.g.  glob:at sea*
+    #Returns:
+        Regular expression text or None if pattern is not valid
+    """
+    if key.startswith(REGEX_PREFIX):
+        pattern = key[len(REGEX_PREFIX):].strip()
+    else:
+        pattern = fnmatch.translate(key[len(GLOB_PREFIX):].strip())
+    try:
+        re.compile(pattern, re.IGNORECASE)
+    except re.error:
+        return None
+    return pattern
+
+
+class SkipMatcher:
+    """
+    Match place names against the skiplist.  Exact entries are a dictionary lookup.  Glob entries are compiled
+    into a single combined regular expression so checking all of them is one call.  re: entries are compiled
+    separately since they can use inline flags, group names or backreferences that break when combined.
+    Patterns must match the whole place name and are not case sensitive.
+    """
+
+    def __init__(self, skip_dct):
+        """
+        #Args:
+            skip_dct: Skiplist dictionary.  Exact entries are looked up in this dictionary directly
+        """
+        self.logger = logging.getLogger(__name__)
+        self.skip_dct = skip_dct
+        self.matchers = []
+        self.pattern_count = 0
+        self.build()
+
+    def build(self):
+        """ Compile pattern entries.  Call again if patterns were added """
+        glob_patterns = []
+        regex_patterns = []
+        for key in self.skip_dct:
+            if not is_pattern(key):
+                continue
+            pattern = compile_pattern(key)
+            if pattern is None:
+                self.logger.warning(f'Invalid skiplist pattern [{key}]')
+            elif key.startswith(REGEX_PREFIX):
+                regex_patterns.append(pattern)
+            else:
+                glob_patterns.append(pattern)
+        self.pattern_count = len(glob_patterns) + len(regex_patterns)
+
+        self.matchers = []
+        if glob_patterns:
+            try:
+                self.matchers.append(re.compile('|'.join(f'(?:{pattern})' for pattern in glob_patterns), re.IGNORECASE))
+            except re.error as e:
+                self.logger.warning(f'Unable to combine skiplist patterns: {e}')
+                regex_patterns = glob_patterns + regex_patterns
+        for pattern in regex_patterns:
+            self.matchers.append(re.compile(pattern, re.IGNORECASE))
+        self.logger.debug(f'Skiplist: {len(self.skip_dct) - self.pattern_count} entries, {self.pattern_count} patterns')
+
+    def match(self, town_entry: str) -> bool:
+        """ Returns True if place should be skipped """
+        if self.skip_dct.get(town_entry) is not None:
+            return True
+        for matcher in self.matchers:
+            if matcher.fullmatch(town_entry) is not None:
+                return True
+        return False
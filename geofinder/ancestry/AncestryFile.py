@@ -17,12 +17,19 @@
 #   along with this program; if not, write to the Free Software
 #   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
 import gzip
+import io
 import logging
 import os
+import sys
+from collections import deque
 from tkinter import messagebox
 from typing import Union, Tuple
 
 from tk_helper import TKHelper
+from util import OutputWriter
+
+# Path used to read from stdin and write to stdout (streaming filter mode)
+STREAM_PATH = '-'
 
 
 class AncestryFile:
@@ -31,15 +38,21 @@ class AncestryFile:
     Basic routines to Read/Parse and Write Ancestry files focused on place entries.
     Scan - Read through  file, find specified Tag entry.
     Write out all other entries as-is if out_path is not None
+    If in_path is STREAM_PATH, read from stdin and write to stdout.  The input is never seeked in this mode.
+    Output goes through a buffered OutputWriter and can optionally be GZIP compressed.
     """
+    # Suffix added to output file name when output is compressed
+    compressed_suffix = '.gz'
 
-    def __init__(self, in_path: str, out_sufix: str, cache_d, progress: Union[None, TKHelper.Progress]):
+    def __init__(self, in_path: str, out_sufix: str, cache_d, progress: Union[None, TKHelper.Progress],
+                 compress: bool = False):
         """
         #Args:
             in_path:
             out_sufix:
             cache_d:
             progress:
+            compress: If True, write GZIP compressed output
         """
         self.build = False
         self.logger = logging.getLogger(__name__)
@@ -50,13 +63,17 @@ class AncestryFile:
         self.filesize = 0
         self.infile = None
         self.error = False
+        self.stream = in_path == STREAM_PATH
         self.out_path = self.in_path + '.' + self.out_suffix
         self.temp_suffix = '.tmp'
 
         self.more_available = False
+        self.pending_lines = deque()   # Lines that were read ahead and need to be handled again
+        self.record_cache = None       # Set by derived classes that support incremental runs
 
         self.place_total = 0
         self.line_num = 0
+        self.percent_complete = 0
 
         self.value: str = ""
         self.tag: str = ""        # PLAC indicates this is a Place entry
@@ -69,11 +86,17 @@ class AncestryFile:
         self.date = ''
         self.abt_flag = False
 
-        if self.out_suffix != '':
+        if self.out_suffix != '' and self.stream:
+            # Streaming filter - write to stdout
+            self.out_path = STREAM_PATH
+            self.outfile = OutputWriter.OutputWriter(sys.stdout.buffer, compress=compress)
+            self.logger.info(f'Output to stdout')
+        elif self.out_suffix != '':
             # Create an output file with same name with suffix appended
-            self.outfile = open(self.out_path, "w",
-                                encoding='utf-8')
-            self.logger.info(f'Opened Output file: {self.out_path}')
+            if compress:
+                self.out_path += self.compressed_suffix
+            self.outfile = OutputWriter.OutputWriter(open(self.out_path, "wb"), compress=compress)
+            self.logger.info(f'Opened Output file: {self.out_path} compress={compress}')
         else:
             self.outfile = None
 
@@ -88,7 +111,15 @@ class AncestryFile:
 
     def open(self, in_path) -> bool:
         # Open ancestry file
-        if os.path.exists(in_path):
+        if self.stream:
+            # Read from stdin.  Check for GZIP magic number without consuming input
+            raw = sys.stdin.buffer
+            if raw.peek(2)[:2] == b'\x1f\x8b':
+                raw = gzip.GzipFile(fileobj=raw, mode='rb')
+            self.infile = io.TextIOWrapper(raw, encoding='utf-8', errors='replace')
+            self.logger.info(f'Opened Input:  stdin')
+            self.error = False
+        elif os.path.exists(in_path):
             # gzip.open('file.gz', 'rt', encoding='utf-8')
             self.infile = gzip.open(in_path, 'rt', encoding='utf-8', errors='replace')
             try:
@@ -109,6 +140,13 @@ class AncestryFile:
             self.error = True
         return self.error
 
+    def input_position(self) -> int:
+        """ Bytes of input file read so far.  For a GZIP file this is the compressed position, like filesize """
+        raw = self.infile.buffer
+        if isinstance(raw, gzip.GzipFile):
+            raw = raw.fileobj
+        return raw.tell()
+
     def get_next_place(self) -> (str, bool):
         # Scan  file for Place entry or EOF
         # Output all other lines as-is to outfile
@@ -127,20 +165,19 @@ class AncestryFile:
                 pass
             else:
                 # Not a target entry.   Write out line as-is
-                if self.outfile is not None:
-                    self.outfile.write(line)
+                self.write_out(line)
 
     def read_and_parse_line(self) -> Tuple[str, bool, str]:
         # Read a line from file.  Handle line.
         id =''
         if not self.more_available:
-            line = self.infile.readline()
+            line = self.readline()
             #self.logger.debug(f'Read line [{line}]')
             self.line_num += 1
             if line == "":
                 # End of File
                 self.logger.info(f'End of file. PLACE COUNT={self.place_total}')
-                if self.place_total < 10:
+                if self.place_total < 10 and not self.stream:
                     messagebox.showinfo('File Read', f'File contained {self.place_total} places')
                 return "", True, id
         else:
@@ -158,17 +195,51 @@ class AncestryFile:
         """ Collect details for event - last name, event date, and tag in GEDCOM file."""
         pass
 
+    def readline(self) -> str:
+        """ Read next line.  Lines that were read ahead are returned first """
+        if self.pending_lines:
+            return self.pending_lines.popleft()
+        return self.infile.readline()
+
+    def write_out(self, text: str):
+        """ Write text to output file and add it to the record cache output """
+        if self.outfile is not None:
+            self.outfile.write(text)
+        if self.record_cache is not None:
+            self.record_cache.add_output(text)
+
+    def add_replacement(self, key: str, entry):
+        """
+        Global replace lookup was made for the current place.  Kept with the result in incremental mode so
+        the result is not reused if the lookup would now give a different entry
+        #Args:
+            key: Global replace key
+            entry: Entry found, or None if there was no entry
+        """
+        if self.record_cache is not None:
+            self.record_cache.add_replacement(key, entry)
+
     def peak_next_line(self):
-        """ Return a peak at next line but dont move forward in file """
-        pos = self.infile.tell()
+        """ Return a peak at next line but dont move forward in file.  Line is held in pending_lines (no seek) """
+        if self.pending_lines:
+            return self.pending_lines[0]
         line = self.infile.readline()
-        self.infile.seek(pos)  # Back up to where we were
+        if line != '':
+            self.pending_lines.append(line)
         return line
 
     def close(self):
-        self.infile.close()
-        if self.outfile is not None:
-            self.outfile.close()
+        if self.stream:
+            # Don't close stdin / stdout
+            if self.outfile is not None:
+                self.outfile.flush()
+        else:
+            self.infile.close()
+            if self.outfile is not None:
+                self.outfile.close()
+        if self.record_cache is not None:
+            self.record_cache.write()
+            self.record_cache = None
         self.logger.debug(f'Closed Ancestry input and output files')
 
         #out_path = f"{self.in_path}.{self.out_suffix}"
@@ -201,6 +272,10 @@ class AncestryFile:
         """ Write updated place out """
         pass
 
+    def lookup_in_parent(self, place) -> bool:
+        """ Look up current place within its enclosing place.  Returns True and updates place if found """
+        return False
+
     def write_asis(self, entry:str):
         """ Write out place entry as is.  """
         pass
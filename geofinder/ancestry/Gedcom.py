@@ -18,21 +18,26 @@
 #   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
 import os
 import re
-from typing import Match, Union
+from typing import Match, Union, Tuple, List
 
 from tk_helper import TKHelper
 from ancestry.AncestryFile import AncestryFile
-from util import CachedDictionary
+from util import RecordCache, SqliteDictionary
 
 PLACE_TOTAL_KEY = 'PLACE_TOTAL'
 
+# A level 0 line starts a new GEDCOM record
+record_start_regex = re.compile(r"^\s*0\s")
+place_regex = re.compile(r"^\s*\d+\s+PLAC\s")
+
 
 class Gedcom(AncestryFile):
     """
     Routines to Read/Parse and Write GEDCOM ancestry files (focused on PLACE entries).
     """
 
-    def __init__(self, in_path: str, out_suffix: str, cache_d, progress: Union[None, TKHelper.Progress]):
+    def __init__(self, in_path: str, out_suffix: str, cache_d, progress: Union[None, TKHelper.Progress],
+                 incremental: bool = False, compress: bool = False, stamp: str = '', replace_cd=None):
         """
         Routines to Read/Parse and Write GEDCOM ancestry files focused on place entries.
 
@@ -41,20 +46,37 @@ class Gedcom(AncestryFile):
             out_suffix:
             cache_d:
             progress:
+            incremental: If True, records that are unchanged since the previous run are copied from the
+                previous output without being processed
+            compress: If True, write GZIP compressed output (.gz is added to output name)
+            stamp: Incremental mode.  Identifies geodata.db build and global replace format.  Previous output
+                is only reused if it is the same
+            replace_cd: Incremental mode.  Global replace dictionary used to check entries a record used
         """
-        super().__init__(in_path, out_suffix, cache_d, progress)
+        super().__init__(in_path, out_suffix, cache_d, progress, compress)
 
         # Sections of a GEDCOM line - Level, label, tag, value
         self.level: int = 0
         self.label: str = ""
 
-        # Build dictionary of name/id pairs and write to pickle cache file.  If pickle file already there, just read it.
+        # Build dictionary of name/id pairs and store it in the settings database.  If already there, just read it.
         parts = os.path.split(in_path)
         filename = parts[1] + '.pkl'
-        self.person_cd = CachedDictionary.CachedDictionary(cache_d, filename)
 
-        # Try to read pickle file of IDs for this GEDCOM file
-        err = self.person_cd.read()
+        if self.stream:
+            # Streaming input can't be scanned twice.  Don't build person dictionary - use names as they are read.
+            # No directory, so nothing is stored in the database
+            self.person_cd = SqliteDictionary.SqliteDictionary(None, filename)
+            err = False
+            if incremental:
+                self.logger.warning('Incremental mode is not available when reading from stdin')
+                incremental = False
+        else:
+            # Try to read IDs for this GEDCOM file.  Table name is based on full path so each file has its own table
+            self.person_cd = SqliteDictionary.SqliteDictionary(cache_d, filename,
+                                                               table='person_' + os.path.abspath(in_path))
+            err = self.person_cd.read()
+
         if err:
             # ID Dictionary File is not there.  Build it - it is a dictionary of GED Name_IDs to Names
             self.build_person_dictionary()
@@ -64,6 +86,13 @@ class Gedcom(AncestryFile):
                 self.place_total = self.person_cd.dict.get(PLACE_TOTAL_KEY)
             self.logger.debug(f'Place Total ={self.place_total}')
 
+        if incremental:
+            # Record hashes and output from previous run are stored next to the person dictionary
+            self.record_cache = RecordCache.RecordCache(cache_d, parts[1] + '.records.pkl', stamp=stamp,
+                                                        replace_cd=replace_cd)
+            # Count of records without a label for each tag.  Used to make a key for them
+            self.unlabelled_count = {}
+
     def parse_line(self, line: str):
         """
         Called by read_and_parse_line for each line in file.  Parse line
@@ -93,12 +122,65 @@ class Gedcom(AncestryFile):
             self.label = ''
 
         # update progress bar
-        self.percent_complete = int(self.infile.tell() * 100 / self.filesize)
+        if self.filesize > 0:
+            self.percent_complete = int(self.infile.tell() * 100 / self.filesize)
         if self.line_num % 1000 == 1:
             self.progress(f"Scanning ", self.percent_complete)
 
         return self.id
 
+    def read_and_parse_line(self) -> Tuple[str, bool, str]:
+        """
+        Read and parse next line.  If incremental is enabled, check each new record against the
+        record cache.  If the record is unchanged since the last run, write out the previous output for it
+        and skip to the next record.
+        """
+        while True:
+            line, err, id = super().read_and_parse_line()
+            if self.record_cache is None:
+                return line, err, id
+            if err:
+                self.record_cache.end_of_file()
+                return line, err, id
+            if self.level != 0:
+                return line, err, id
+
+            # Start of a new record.  Read ahead to get the rest of the record
+            body, next_line = self.read_record_body()
+            if self.label is not None:
+                key = self.label
+            else:
+                # No label (e.g. several 0 NOTE records).  Use tag and position
+                ordinal = self.unlabelled_count.get(self.tag, 0)
+                self.unlabelled_count[self.tag] = ordinal + 1
+                key = f'{self.tag}#{ordinal}'
+            output = self.record_cache.start_record(key, line + ''.join(body))
+            if output is None:
+                # New or modified record.  Put lines back so it gets processed normally
+                self.pending_lines.extend(body)
+                if next_line != '':
+                    self.pending_lines.append(next_line)
+                return line, err, id
+
+            # Unchanged record.  Reuse previous output
+            self.write_out(output)
+            self.place_total -= sum([1 for ln in body if place_regex.match(ln)])
+            if next_line != '':
+                self.pending_lines.append(next_line)
+
+    def read_record_body(self) -> Tuple[List[str], str]:
+        """
+        Read the remaining lines of the current record
+        #Returns:
+            List of lines in record, First line of next record (or '' at end of file)
+        """
+        body = []
+        while True:
+            line = self.readline()
+            if line == '' or record_start_regex.match(line):
+                return body, line
+            body.append(line)
+
     def write_updated(self, value: str, place):
         """
         Write out a  line with updated values.  Put together the pieces:  level, Label, tag, value
@@ -112,7 +194,7 @@ class Gedcom(AncestryFile):
             else:
                 line = f"{self.level} {self.tag} {value.strip(', ')}\n"
 
-            self.outfile.write(line)
+            self.write_out(line)
 
     def write_asis(self, entry):
         """
@@ -120,13 +202,17 @@ class Gedcom(AncestryFile):
         #Args:
             entry: not used
         """
+        if self.record_cache is not None:
+            # Place was not resolved.  Don't reuse this record on the next run
+            self.record_cache.invalidate()
+
         if self.outfile is not None:
             if self.label is not None:
                 res = f"{self.level} {self.label} {self.tag} {self.value}\n"
             else:
                 res = f"{self.level} {self.tag} {self.value}\n"
 
-            self.outfile.write(res)
+            self.write_out(res)
 
     def write_lat_lon(self, lat: float, lon: float):
         """
@@ -150,26 +236,26 @@ class Gedcom(AncestryFile):
 
                 if self.tag == "MAP":
                     # Read this MAP command and do nothing with it
-                    self.infile.readline()
+                    self.readline()
 
                     # Check for LATI line
                     line = self.peak_next_line()
                     self.parse_line(line)
                     if self.tag == "LATI" or self.tag == "LONG":
                         # Read this LATI command and do nothing with it
-                        self.infile.readline()
+                        self.readline()
 
                     # Check for LONG line
                     line = self.peak_next_line()
                     self.parse_line(line)
                     if self.tag == "LATI" or self.tag == "LONG":
                         # Read this LONG command and do nothing with it
-                        self.infile.readline()
+                        self.readline()
 
                 # Write out MAP Latitude/Longitude section
-                self.outfile.write(f"{str(map_level)} MAP\n")
-                self.outfile.write(f"{str(lati_level)} LATI {lat}\n")
-                self.outfile.write(f"{str(lati_level)} LONG {lon}\n")
+                self.write_out(f"{str(map_level)} MAP\n")
+                self.write_out(f"{str(lati_level)} LATI {lat}\n")
+                self.write_out(f"{str(lati_level)} LONG {lon}\n")
 
     def collect_event_details(self):
         """ Collect details for events with places - last name, event date, and tag in GEDCOM file."""
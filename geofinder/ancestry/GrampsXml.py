@@ -16,17 +16,21 @@
 #   You should have received a copy of the GNU General Public License
 #   along with this program; if not, write to the Free Software
 #   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+import copy
 import os
-import re
 import xml.etree.ElementTree as Tree
-from io import BytesIO
+from collections import deque
+from xml.sax.saxutils import escape
 from typing import Union
 
+from geodata import GeoUtil, Normalize
 from tk_helper import TKHelper
 
 #todo pull out dependency on grampsCsv
 import GrampsCsv
 from ancestry.AncestryFile import AncestryFile
+from util import PlaceCache
+from util.PlaceCache import PlaceEntry
 
 # 0Place (ID), 1Title, 2Name, 3Type, 4latitude, 5longitude, enclosed_by
 
@@ -37,6 +41,65 @@ class State:
     COLLECT_PLACE_TREE = 1
     WALK_PLACE_TREE = 2
     REACHED_TREE_END = 3
+    STREAM_PLACES = 4
+
+
+# Gramps DTD order is ptitle, pname, code, coord.  A new coord element goes after these
+before_coord = ['ptitle', 'pname', 'code']
+# Place objects serialized at a time when the XML tree is written
+WRITE_BATCH = 5000
+
+
+def parents_first(places) -> deque:
+    """
+    Order place objects so that each place comes after the place that encloses it (first placeref)
+    #Args:
+        places: place objects in file order
+    #Returns:
+        deque of place objects, parents first
+    """
+    by_handle = {plac.get('handle'): plac for plac in places}
+    ordered = deque()
+    done = set()
+    for plac in places:
+        # Walk up the enclosure chain to the first place already handled (or the top)
+        chain = []
+        while plac is not None and plac.get('handle') not in done:
+            done.add(plac.get('handle'))
+            chain.append(plac)
+            placeref = plac.find('placeref')
+            plac = by_handle.get(placeref.get('hlink')) if placeref is not None else None
+        ordered.extend(reversed(chain))
+    return ordered
+
+
+def lookup_in_scope(geodb_conn, name: str, scope) -> str:
+    """
+    Look up a place name only within the area of its enclosing place
+    #Args:
+        geodb_conn: geodata.db connection
+        name: Short place name
+        scope: (country_iso, admin1_id, admin2_id) of enclosing place.  Blank IDs are not used
+    #Returns:
+        GEOID if exactly one place in the scope has this name, else ''
+    """
+    iso, admin1_id, admin2_id = scope
+    if iso == '':
+        return ''
+    where = 'name = ? AND country = ?'
+    args = [Normalize.normalize(name, remove_commas=True), iso]
+    if admin1_id != '':
+        where += ' AND admin1_id = ?'
+        args.append(admin1_id)
+    if admin2_id != '':
+        where += ' AND admin2_id = ?'
+        args.append(admin2_id)
+    cur = geodb_conn.cursor()
+    cur.execute(f'SELECT DISTINCT geoid FROM main.geodata WHERE {where} LIMIT 2', args)
+    rows = cur.fetchall()
+    if len(rows) != 1:
+        return ''
+    return rows[0][0]
 
 
 class GrampsXml(AncestryFile):
@@ -62,64 +125,134 @@ class GrampsXml(AncestryFile):
     </places>
 
     xmllint --c14n one.xml > 1.xml
+
+    By default the places section is streamed:  each placeobj is handled as soon as it has been parsed, then written
+    out and cleared, so memory use does not depend on the number of places.  If load_tree is True, the whole places
+    section is loaded into an XML tree first (needed when a place must be resolved with its enclosing places).
+
+    If hierarchy is True, the places are handled parents first, following the placeref links.  When a place's
+    enclosing place has been resolved, a short place name is first looked up only within the country/admin1/admin2
+    area of the enclosing place.  If that doesn't give a unique match, the name followed by the resolved name of
+    the enclosing place is looked up, so the county/state/country part of the lookup is already in canonical form.
     """
 
-    def __init__(self, in_path: str, out_suffix: str, cache_d, progress: Union[None, TKHelper.Progress], geodata):
-        super().__init__(in_path, out_suffix, cache_d, progress)
+    # Gramps XML files are normally GZIP compressed, so the name is the same when output is compressed
+    compressed_suffix = ''
+
+    def __init__(self, in_path: str, out_suffix: str, cache_d, progress: Union[None, TKHelper.Progress], geodata,
+                 compress: bool = False, load_tree: bool = False, incremental: bool = False,
+                 hierarchy: bool = False, csv_max_rows: int = 0, stamp: str = '', replace_cd=None):
+        """
+        #Args:
+            in_path:
+            out_suffix:
+            cache_d:
+            progress:
+            geodata:
+            compress: If True, write GZIP compressed output
+            load_tree: If True, load the whole places section into an XML tree instead of streaming it
+            incremental: If True, places with the same change stamp as the previous run get the previous
+                result without being processed
+            hierarchy: If True, resolve enclosing places first and scope short names to them.  Loads tree
+            csv_max_rows: If not zero, maximum CSV rows kept in memory for each hierarchy level
+            stamp: Incremental mode.  Identifies geodata.db build and global replace format.  Previous results
+                are only reused if it is the same
+            replace_cd: Incremental mode.  Global replace dictionary used to check lookups a place made
+        """
+        super().__init__(in_path, out_suffix, cache_d, progress, compress)
         self.xml_tree = None
         self.collect_lines = False
-        self.xml_places_buffer = b''
+        self.tree_parser = None     # Parser for loading places section into tree
+        self.hierarchy = hierarchy
+        self.load_tree = load_tree or hierarchy
+        self.resolved_names = {}    # Resolved name by placeobj handle (hierarchy mode)
+        self.resolved_scopes = {}   # Resolved (country_iso, admin1_id, admin2_id) by placeobj handle (hierarchy mode)
+        self.scope = None           # (country_iso, admin1_id, admin2_id) for place if it was updated
+        self.parent_scope = None    # (country_iso, admin1_id, admin2_id) of resolved enclosing place
+        self.geodata = geodata
+        self.parser = None          # Pull parser for streaming places section
+        self.places_root = None
+        self.place_queue = deque()  # Place objects that have been parsed (or loaded into tree) but not handled yet
+        self.places_end_text = None
+        self.plac = None
+        self.coord = None
+        self.title_elem = None
+        self.name_elem = None
+        self.resolved = False       # True if place was updated
+        self.reused = False         # True if place got result from previous run
+        self.csv_node = None        # CSV node for place if it was updated
+        self.place_cache = None
+        self.replacements = []      # Global replace lookups made for current place
         self.place = None
         self.child = None
         self.state = State.PASS_THROUGH  # Write out each line as-is unless we are in Place section
-        self.got_pname = False
-        self.got_place = False
         self.lon = 99.9
         self.lat = 99.9
         self.place_complete = 0
-        self.csv = GrampsCsv.GrampsCsv(in_path=in_path, geodata=geodata)
+        self.csv = GrampsCsv.GrampsCsv(in_path=in_path, geodata=geodata, max_rows=csv_max_rows)
         self.title = ''
 
+        if incremental:
+            # Results from previous run, by placeobj handle
+            self.place_cache = PlaceCache.PlaceCache(cache_d, os.path.split(in_path)[1] + '.places.pkl',
+                                                     stamp=stamp, replace_cd=replace_cd)
+
     def parse_line(self, line: str):
         # Called by read_and_parse_line for each line in file
-        # Accumulate all XML place entries into binary string, then build XML tree, then search XML tree
-        # and return each entry in self.value with self.tag set to PLAC
+        # Stream each XML place entry (or accumulate all XML place entries and build an XML tree, then walk
+        # the XML tree) and return each entry in self.value with self.tag set to PLAC
+        self.tag = 'OTHER'
 
         # Set State
-        if '<places>' in line:
-            # Reached the start of Places XML section.  Accumulate XML text until end of section
-            self.state = State.COLLECT_PLACE_TREE
-            self.logger.debug('XML places section - start')
-        elif '</places>' in line:
+        if self.state == State.PASS_THROUGH and '<places>' in line:
+            if self.load_tree:
+                # Reached the start of Places XML section.  Feed each line to parser until end of section
+                self.state = State.COLLECT_PLACE_TREE
+                self.tree_parser = Tree.XMLParser()
+                self.logger.debug('XML places section - start')
+            else:
+                # Reached the start of Places XML section.  Write this line out as-is and feed the
+                # pull parser from <places> on
+                self.state = State.STREAM_PLACES
+                self.parser = Tree.XMLPullParser(events=('start', 'end'))
+                self.parser.feed(line[line.index('<places>'):])
+                self.logger.debug('XML places section - start streaming')
+                return self.id
+        elif self.state == State.COLLECT_PLACE_TREE and '</places>' in line:
             # Reached the end of Places section
             # TODO - Handle case where there is additional data on </places> line, such as '</places> <objects>'
-            line += '\n'
-            self.xml_places_buffer += bytes(line, "utf8")
-            self.logger.debug(f'XML Places section - complete.  len={len(self.xml_places_buffer)}')
-
-            # Build tree from XML string
-            try:
-                self.xml_tree = Tree.parse(BytesIO(self.xml_places_buffer))
-            except TypeError:
-                self.logger.warning(f'XML parse error')
-                self.xml_tree = None
-            self.place_total = sum([1 for entry in self.xml_tree.getiterator('placeobject')])
+            self.logger.debug(f'XML Places section - complete.  line={self.line_num}')
+
+            # Build tree from lines fed to parser
+            self.feed_tree_parser(line)
+            if self.tree_parser is not None:
+                try:
+                    self.xml_tree = Tree.ElementTree(self.tree_parser.close())
+                except Tree.ParseError as e:
+                    self.logger.warning(f'XML parse error {e}')
+                self.tree_parser = None
+            # Gather place objects once.  Each is taken from the front of the queue as it is handled
+            if self.xml_tree is not None:
+                self.place_queue = deque(self.xml_tree.getroot().iter('placeobj'))
+                if self.hierarchy:
+                    self.place_queue = parents_first(self.place_queue)
+            self.place_total = len(self.place_queue)
             self.logger.info(f'XML Parse complete. PLACE COUNT={self.place_total}')
 
+            # Walk tree without reading any more lines
             self.state = State.WALK_PLACE_TREE
+            self.more_available = True
+            line = ''
 
         # Handle line based on State
-        self.tag = 'OTHER'
-
         if self.state == State.COLLECT_PLACE_TREE:
-            # Collect lines
-            # Convert all placeobj tags to placeobject tag
-            # As each is processed we convert it back to placeobj
-            # This allows us to keep track of which Place Objects we have processed.
-            line = re.sub('placeobj', 'placeobject', line)
-            self.xml_places_buffer += bytes(line, "utf8")
+            # Feed line to parser.  Parser builds tree incrementally
+            self.feed_tree_parser(line)
             #self.logger.debug(f'Collect XML [{line}]')
             self.tag = 'IGNORE'
+        elif self.state == State.STREAM_PLACES:
+            # Set self.value with next place
+            self.stream_xml_place(line)
         elif self.state == State.PASS_THROUGH:
             #  output line in get_next_place
             #self.logger.debug(f'Pass through XML [{line}]')
@@ -128,114 +261,296 @@ class GrampsXml(AncestryFile):
             # Set self.value with next place
             self.find_xml_place()
         elif self.state == State.REACHED_TREE_END:
-            # Got to END OF TREE.  WRITE XML tree
+            # Got to END OF TREE.  WRITE XML tree, then create the CSV file
             self.logger.debug('End of XML tree')
+            self.more_available = False
             self.write_out_tree()
-            self.csv.create_enclosures()
-            self.csv.write_csv_file()
+            self.end_of_places()
 
         return self.id
 
-    def write_out_tree(self):
-        # Write out XML tree
-        tmp_name = self.out_path + '.tmp'
-        self.logger.debug(f'Writing XML tree to tempfile: {tmp_name}')
-        self.xml_tree.write(tmp_name)
+    def feed_tree_parser(self, line: str):
+        """ Feed line to tree parser.  Parser is dropped on error and tree will be empty """
+        if self.tree_parser is None:
+            return
+        try:
+            self.tree_parser.feed(line)
+        except Tree.ParseError as e:
+            self.logger.warning(f'XML parse error {e}')
+            self.tree_parser = None
+
+    def stream_xml_place(self, line: str):
+        """
+        Feed line to pull parser and set self.value with the next place object that is complete.
+        The previous place object is written out and removed from memory.
+        """
+        self.tag = 'IGNORE'
+        self.finish_place()
+
+        if line != '':
+            if '</places>' in line:
+                # Feed the rest of the places section.  Text after it is written when we are done with the places
+                idx = line.index('</places>')
+                self.parser.feed(line[:idx + len('</places>')])
+                self.places_end_text = line[idx:]
+            else:
+                self.parser.feed(line)
 
-        # Append XML tmp file to our output file
-        self.append_file(tmp_name)
+            for event, elem in self.parser.read_events():
+                if event == 'start' and elem.tag == 'places':
+                    self.places_root = elem
+                elif event == 'end' and elem.tag == 'placeobj':
+                    self.place_queue.append(elem)
 
+        if self.next_place():
+            # Handle next place.  Don't read more lines until it is written out
+            self.more_available = True
+            return
+
+        self.more_available = False
+        if self.places_end_text is not None:
+            # All places written.  Back to pass through
+            self.place_total = self.place_complete
+            self.logger.info(f'XML Stream complete. PLACE COUNT={self.place_total}')
+            self.write_out(self.places_end_text)
+            self.places_end_text = None
+            try:
+                self.parser.close()
+            except Tree.ParseError as e:
+                self.logger.warning(f'XML parse error {e}')
+            self.parser = None
+            self.places_root = None
+            self.state = State.PASS_THROUGH
+            self.end_of_places()
+
+    def end_of_places(self):
+        """ All places have been handled.  Create the CSV file """
+        if self.place_cache is not None:
+            self.place_cache.end_of_file()
+
+        def csv_progress(percent: int):
+            self.progress(f'Creating CSV enclosures', percent)
+
+        self.csv.create_enclosures(progress=csv_progress)
+        self.csv.write_csv_file()
         # All additional text is pass through (not part of Place section)
         self.state = State.PASS_THROUGH
-        #self.outfile.close()
-
-    def append_file(self, temp_path):
-        # Append temp file to our output
-        self.outfile.flush()
-        tmp_file = open(temp_path, 'r')
-        # Read in chunks
-        while True:
-            data = tmp_file.read(65536)
-            if data:
-                self.outfile.write(data)
-            else:
-                break
-        tmp_file.close()
-        self.logger.debug(f'Removing temp file: {temp_path}')
-        os.remove(temp_path)
+
+    def write_out_tree(self):
+        """ Serialize XML tree into output stream in batches of place objects so progress can be shown """
+        if self.xml_tree is None or self.outfile is None:
+            return
+        self.logger.debug(f'Writing XML tree to {self.out_path}')
+        root = self.xml_tree.getroot()
+        if len(root) == 0:
+            self.xml_tree.write(self.outfile, encoding='unicode')
+        else:
+            # Start tag with the same attribute escaping as ElementTree
+            start_tag = Tree.tostring(Tree.Element(root.tag, root.attrib), encoding='unicode')[:-len(' />')] + '>'
+            self.outfile.write(start_tag + escape(root.text or ''))
+            total = len(root)
+            for idx in range(0, total, WRITE_BATCH):
+                # Serialize a batch of place objects inside an empty element and drop its tags
+                batch = Tree.Element('b')
+                batch.extend(root[idx:idx + WRITE_BATCH])
+                self.outfile.write(Tree.tostring(batch, encoding='unicode')[len('<b>'):-len('</b>')])
+                self.progress(f'Writing XML', min(100, int((idx + WRITE_BATCH) * 100 / total)))
+            self.outfile.write(f'</{root.tag}>{escape(root.tail or "")}')
         self.outfile.write('\n')
-        self.outfile.flush()
 
     def find_xml_place(self):
-        # Find the next placeobject entry in Tree
-        # Each time we process a place, change XML tag to placeobj and
-        # set self.tag to PLAC so we don't handle again
-
-        # Find first placeobject
-        self.plac = self.xml_tree.find('placeobject')
-
-        if self.plac is not None:
-            #self.logger.debug(f'\n\nPLACEOBJECT {self.place.tag} =========')
-            self.id = self.plac.get("id")
-            self.title = ''
-            self.name = ''
-            self.place_complete += 1
-            # update progress bar
-            self.percent_complete = int(self.place_complete * 100 / self.place_total)
-            self.progress(f" ", self.percent_complete)
+        # Get the next place object in Tree from the place queue
+        self.tag = 'IGNORE'
+        self.finish_place()
 
-            # Walk thru each entry in place object
-            for place_entry in self.plac.iter():
-                self.child = place_entry
-                # print(f'tag ={place_entry.tag}')
-                if place_entry.tag == 'ptitle' and self.got_place is False:
-                    self.tag = 'PLAC'
-                    self.value = place_entry.text
-                    self.title = self.value
-                    #self.logger.debug(f'PTITLE <{place_entry.tag} VALUE="{self.value}"/>')
-                    self.got_place = True
-                    #return
-                elif place_entry.tag == 'pname' and self.got_pname is False:
-                    # <pname value="Chelsea, Greater London, England, United Kingdom"/>
-                    self.tag = 'PLAC'
-                    self.value = place_entry.get('value')
-                    self.name = self.value
-                    #self.logger.debug(f'PNAME <{place_entry.tag} VALUE="{self.value}"/>')
-                    self.got_pname = True
-                    #return
-                elif place_entry.tag == 'coord':
-                    # <coord long="-0.16936" lat="51.48755"/>
-                    self.lon = place_entry.attrib.get('long')
-                    self.lat = place_entry.attrib.get('lat')
-                    self.tag = 'IGNORE'
-                    #self.logger.debug(f'<{place_entry.tag} LONG="{self.lon}" LAT="{self.lat}"/>')
-                    self.plac.remove(place_entry)
-                else:
-                    # print(f'DD <{place_entry.tag} {place_entry.attrib}>')
-                    pass
-
-            # Done walking through place element
-            if self.lat != 99.9:
-                # Create Coord Latitude/Longitude section
-                coord_elem = Tree.Element("coord")
-                coord_elem.set('long', str(self.lon))
-                coord_elem.set('lat', str(self.lat))
-                self.plac.append(coord_elem)
-
-            # Change tag back to 'placeobj' so we don't visit it next time we are called
-            self.plac.tag = 'placeobj'
-
-            # Reset values
-            self.got_pname = False
-            self.got_place = False
-        else:
+        if not self.next_place():
             # Tree completed.  No more place objects available
             self.logger.debug('XML tree complete')
             self.state = State.REACHED_TREE_END
 
+    def next_place(self) -> bool:
+        """
+        Take the next place object from the place queue.  Places that are unchanged since the previous
+        run get the previous result and are finished here
+        #Returns:
+            True if there is a place for lookup.  False if queue is empty
+        """
+        while len(self.place_queue) > 0:
+            self.begin_place(self.place_queue.popleft())
+            if not self.reuse_place():
+                return True
+            self.finish_place()
+        return False
+
+    def reuse_place(self) -> bool:
+        """
+        If place is unchanged since previous run, update it with the previous result
+        #Returns:
+            True if previous result was used
+        """
+        if self.place_cache is None:
+            return False
+        entry = self.place_cache.lookup(self.plac.get('handle'), self.plac.get('change'), self.title, self.name)
+        if entry is None:
+            return False
+        if entry[PlaceEntry.CSV] is not None and not isinstance(entry[PlaceEntry.CSV][2], GrampsCsv.CsvRow):
+            # Saved by an older version
+            return False
+
+        if self.title_elem is not None:
+            self.title_elem.text = entry[PlaceEntry.OUT_TITLE]
+        if self.name_elem is not None:
+            self.name_elem.set('value', entry[PlaceEntry.OUT_NAME])
+        self.lat = entry[PlaceEntry.LAT]
+        self.lon = entry[PlaceEntry.LON]
+        if entry[PlaceEntry.CSV] is not None:
+            dict_idx, key, row = entry[PlaceEntry.CSV]
+            self.csv.add_row(dict_idx, key, copy.copy(row))
+            self.scope = (row.iso, row.admin1_id, row.admin2_id)
+        self.tag = 'IGNORE'
+        self.reused = True
+        return True
+
+    def begin_place(self, plac):
+        """
+        Start handling a place object.  Set self.value with the place name and self.child with the
+        element the name came from.  Save coordinates if there are any
+        """
+        self.plac = plac
+        self.id = plac.get("id")
+        self.title = ''
+        self.name = ''
+        self.child = None
+        self.coord = None
+        self.title_elem = None
+        self.name_elem = None
+        self.resolved = False
+        self.reused = False
+        self.csv_node = None
+        self.scope = None
+        self.parent_scope = None
+        self.replacements = []
+        self.lon = 99.9
+        self.lat = 99.9
+        self.place_complete += 1
+
+        # update progress bar when percent changes
+        if self.place_total > 0:
+            percent = int(self.place_complete * 100 / self.place_total)
+        elif self.filesize > 0:
+            # Streaming.  Place total isn't known until the end of the places section, so use file position
+            percent = int(self.input_position() * 100 / self.filesize)
+        else:
+            percent = self.percent_complete
+        if percent != self.percent_complete:
+            self.percent_complete = percent
+            self.progress(f" ", self.percent_complete)
+
+        # Walk thru each entry in place object
+        for place_entry in plac:
+            if place_entry.tag == 'ptitle' and self.title == '':
+                self.tag = 'PLAC'
+                self.value = place_entry.text
+                self.title = self.value
+                self.child = place_entry
+                self.title_elem = place_entry
+            elif place_entry.tag == 'pname' and self.name == '':
+                # <pname value="Chelsea, Greater London, England, United Kingdom"/>
+                self.tag = 'PLAC'
+                self.value = place_entry.get('value')
+                self.name = self.value
+                self.child = place_entry
+                self.name_elem = place_entry
+            elif place_entry.tag == 'coord':
+                # <coord long="-0.16936" lat="51.48755"/>
+                self.coord = place_entry
+                self.lon = place_entry.attrib.get('long')
+                self.lat = place_entry.attrib.get('lat')
+
+        if self.hierarchy:
+            self.scope_to_parent()
+
+    def scope_to_parent(self):
+        """ If enclosing place was resolved and place name is a short name, look it up within the enclosing place """
+        placeref = self.plac.find('placeref')
+        if placeref is None or self.name_elem is None or ',' in self.name:
+            return
+        parent_name = self.resolved_names.get(placeref.get('hlink'))
+        if parent_name:
+            self.value = f'{self.name}, {parent_name}'
+            self.parent_scope = self.resolved_scopes.get(placeref.get('hlink'))
+
+    def lookup_in_parent(self, place) -> bool:
+        # Look up short name only within the area of the resolved enclosing place
+        if self.parent_scope is None:
+            return False
+        geoid = lookup_in_scope(self.geodata.geo_files.geodb.db.conn, self.name, self.parent_scope)
+        if geoid == '':
+            return False
+        self.geodata.find_geoid(geoid, place)
+        if place.result_type != GeoUtil.Result.STRONG_MATCH:
+            return False
+        place.set_place_type()
+        return True
+
+    def finish_place(self):
+        """ Done with place object.  Update coordinates.  If streaming, write it out and remove it from memory """
+        if self.plac is None:
+            return
+
+        if self.lat != 99.9:
+            # Update Coord Latitude/Longitude section
+            if self.coord is None:
+                self.coord = Tree.Element("coord")
+                idx = 0
+                for idx, place_entry in enumerate(self.plac):
+                    if place_entry.tag not in before_coord:
+                        break
+                else:
+                    idx = len(self.plac)
+                self.plac.insert(idx, self.coord)
+            self.coord.set('long', str(self.lon))
+            self.coord.set('lat', str(self.lat))
+
+        if self.hierarchy and (self.resolved or self.reused) and self.child is not None:
+            # Save resolved name and area for places enclosed by this place
+            self.resolved_names[self.plac.get('handle')] = self.elem_text(self.child)
+            if self.scope is not None:
+                self.resolved_scopes[self.plac.get('handle')] = self.scope
+
+        if self.place_cache is not None and self.resolved:
+            # Place was resolved.  Save result for next run
+            handle = self.plac.get('handle')
+            self.place_cache.add(handle, (self.plac.get('change'), self.title, self.name,
+                                          self.elem_text(self.title_elem), self.elem_text(self.name_elem),
+                                          self.lat, self.lon, self.csv_node, tuple(self.replacements)))
+
+        if self.state == State.STREAM_PLACES:
+            self.plac.tail = '\n'
+            self.write_out(Tree.tostring(self.plac, encoding='unicode'))
+            if self.places_root is not None:
+                self.places_root.remove(self.plac)
+        self.plac = None
+
+    @staticmethod
+    def elem_text(elem) -> str:
+        """ Text of ptitle element or value of pname element """
+        if elem is None:
+            return ''
+        if elem.tag == 'pname':
+            return elem.get('value')
+        return elem.text
+
+    def add_replacement(self, key: str, entry):
+        # Kept in the place cache with the result for this place
+        if self.place_cache is not None:
+            self.replacements.append((key, entry))
+
     def write_updated(self, txt, place):
-        # Update place entry in tree.  Tree will be written out later when entire XML tree is written out
-        self.csv.add_place(place)
+        # Update place entry.  It will be written out when we are done with the place (or with the XML tree)
+        self.csv_node = self.csv.add_place(place)
+        self.scope = (place.country_iso, place.admin1_id, place.admin2_id)
+        self.resolved = True
         if self.child.text is not None:
             self.child.text = txt.strip(', ')
         else:
@@ -244,7 +559,7 @@ class GrampsXml(AncestryFile):
 
     def write_asis(self, entry):
         # Do nothing - No change to place entry
-        # It will be written out later when entire XML tree is written out
+        # It will be written out when we are done with the place (or with the XML tree)
         # TODO implement CSV
         self.csv.write_asis(entry)
         #self.logger.debug(f'AS IS {self.id} {self.value}')
@@ -256,3 +571,9 @@ class GrampsXml(AncestryFile):
             return
         self.lat = lat
         self.lon = lon
+
+    def close(self):
+        super().close()
+        if self.place_cache is not None:
+            self.place_cache.write()
+            self.place_cache = None
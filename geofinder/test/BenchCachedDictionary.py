@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+"""
+Benchmark CachedDictionary (Pickle) against SqliteDictionary for global_replace style dictionaries.
+
+For 1k to 1M entries, prints the time to read the dictionary and the time to save it after one
+entry was changed (what GeoFinder does after each Skip or Save).
+
+    python3 BenchCachedDictionary.py [max_entries]
+"""
+import sys
+import tempfile
+import time
+
+from geofinder.util import CachedDictionary, SqliteDictionary
+
+
+def bench(cache_class, directory, count: int) -> (float, float):
+    """ Returns (read seconds, write-one-change seconds) """
+    cd = cache_class(directory, f'bench{count}.pkl')
+    cd.read()
+    cd.dict = {f'town{idx}, county, state, united states': f'@{idx}@' for idx in range(count)}
+    cd.write()
+
+    cd = cache_class(directory, f'bench{count}.pkl')
+    start = time.perf_counter()
+    cd.read()
+    len(cd.dict)  # SqliteDictionary loads the table on first use
+    read_time = time.perf_counter() - start
+
+    cd.set('new town, county, state, united states', '@999@')
+    start = time.perf_counter()
+    cd.write()
+    write_time = time.perf_counter() - start
+    return read_time, write_time
+
+
+def main():
+    max_entries = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print(f'{"entries":>9}  {"pickle read":>12} {"pickle save":>12}  {"sqlite read":>12} {"sqlite save":>12}')
+    with tempfile.TemporaryDirectory() as directory:
+        count = 1000
+        while count <= max_entries:
+            pkl_read, pkl_write = bench(CachedDictionary.CachedDictionary, directory, count)
+            sql_read, sql_write = bench(SqliteDictionary.SqliteDictionary, directory, count)
+            print(f'{count:>9}  {pkl_read:12.4f} {pkl_write:12.4f}  {sql_read:12.4f} {sql_write:12.4f}')
+            count *= 10
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+"""
+Benchmark loading the places section of a Gramps XML file.
+
+Feeds a synthetic places section line by line to the XML parser, the way GrampsXml does in full-tree mode,
+and prints the load time per place for 10k to 1M places.  Time per place should stay flat (linear scaling).
+
+    python3 BenchXmlPlaces.py [max_places]
+"""
+import sys
+import time
+import xml.etree.ElementTree as Tree
+
+
+def place_lines(count: int):
+    yield '  <places>\n'
+    for idx in range(count):
+        yield f'    <placeobj handle="_h{idx}" change="1571551969" id="P{idx:06d}" type="City">\n'
+        yield f'      <ptitle>Town{idx}, Middlesex County, Massachusetts, United States</ptitle>\n'
+        yield f'      <pname value="Town{idx}"/>\n'
+        yield f'      <coord long="-71.39184" lat="42.48555"/>\n'
+        yield '    </placeobj>\n'
+    yield '  </places>\n'
+
+
+def load_places(count: int) -> float:
+    """ Feed places section to parser and walk the places.  Returns elapsed seconds """
+    start = time.perf_counter()
+    parser = Tree.XMLParser()
+    for line in place_lines(count):
+        parser.feed(line)
+    root = parser.close()
+    total = sum(1 for _ in root.iter('placeobj'))
+    elapsed = time.perf_counter() - start
+    if total != count:
+        raise ValueError(f'Expected {count} places, got {total}')
+    return elapsed
+
+
+def main():
+    max_places = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    count = 10000
+    while count <= max_places:
+        elapsed = load_places(count)
+        print(f'{count:>9} places  {elapsed:8.2f} sec  {elapsed * 1000000 / count:6.2f} usec/place')
+        count *= 10
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import sqlite3
+import unittest
+
+from geodata import Loc
+
+from geofinder.util import AdminNames
+
+
+class FakeDB:
+    # Holds a connection the way geodata GeoDB does (geodb.db.conn)
+    def __init__(self, conn):
+        self.conn = conn
+
+
+class FakeGeoDB:
+    def __init__(self, conn):
+        self.db = FakeDB(conn)
+
+
+class TestAdminNames(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute('CREATE TABLE admin (name TEXT, country TEXT, admin1_id TEXT, admin2_id TEXT, f_code TEXT)')
+        self.conn.execute('CREATE TABLE geodata (name TEXT, country TEXT, admin1_id TEXT, admin2_id TEXT, f_code TEXT)')
+        self.conn.executemany('INSERT INTO admin VALUES (?, ?, ?, ?, ?)',
+                              [('United Kingdom', 'gb', '', '', 'ADM0'), ('England', 'gb', 'ENG', '', 'ADM1'),
+                               ('United States of America', 'us', '', '', 'ADM0'), ('France', 'fr', '', '', 'ADM0')])
+        self.conn.executemany('INSERT INTO geodata VALUES (?, ?, ?, ?, ?)',
+                              [('Kent', 'gb', 'ENG', 'G5', 'ADM2'), ('Kent Duplicate', 'gb', 'ENG', 'G5', 'ADM2'),
+                               ('Dover', 'gb', 'ENG', 'G5', 'PPL')])
+        self.names = AdminNames.AdminNames(FakeGeoDB(self.conn), ['GB', 'US'])
+        self.names.load()
+
+    def tearDown(self) -> None:
+        self.conn.close()
+
+    def test_country(self):
+        self.assertEqual('United Kingdom', self.names.get_country_name('gb'))
+        self.assertEqual('United States', self.names.get_country_name('us'))
+        # Not a supported country
+        self.assertEqual('', self.names.get_country_name('fr'))
+        self.assertEqual('', self.names.get_country_name(''))
+
+    def test_admin(self):
+        place = Loc.Loc()
+        place.country_iso = 'gb'
+        place.admin1_id = 'ENG'
+        place.admin2_id = 'G5'
+        self.assertEqual('England', self.names.get_admin1_name(place))
+        # First row wins, same as the database lookup
+        self.assertEqual('Kent', self.names.get_admin2_name(place))
+        self.assertEqual('Kent', place.admin2_name)
+        # Admin1 ID blank
+        place.admin1_id = ''
+        self.assertEqual('', self.names.get_admin1_name(place))
+        self.assertEqual('Kent', self.names.get_admin2_name(place))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from geofinder import CacheExport
+from geofinder.util import CachedDictionary
+
+
+class TestCacheExport(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        self.path = os.path.join(self.directory, 'export.jsonl')
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def make_cd(self, fname, dct):
+        cd = CachedDictionary.CachedDictionary(self.directory, fname)
+        cd.dict = dict(dct)
+        return cd
+
+    def test_round_trip(self):
+        replace_cd = self.make_cd('r1.pkl', {'paris, france': ('2988507', ''), 'dover': ('2651048', 'st marys')})
+        skip_cd = self.make_cd('s1.pkl', {'at sea': ' '})
+        self.assertEqual(3, CacheExport.export_caches(self.path, replace_cd, skip_cd))
+        with open(self.path, encoding='utf-8') as file:
+            lines = file.readlines()
+        # Header then entries sorted by store and key
+        self.assertIn('"format":"geofinder-cache"', lines[0])
+        self.assertIn('"key":"dover"', lines[1])
+
+        new_replace = self.make_cd('r2.pkl', {})
+        new_skip = self.make_cd('s2.pkl', {})
+        result = CacheExport.import_caches(self.path, new_replace, new_skip)
+        self.assertEqual(2, result.added)
+        self.assertEqual(1, result.skip_added)
+        self.assertEqual(replace_cd.dict, new_replace.dict)
+
+    def test_conflicts_and_validation(self):
+        replace_cd = self.make_cd('r1.pkl', {'dover': ('111', ''), 'kent': ('222', ''), 'paris': ('333', '')})
+        CacheExport.export_caches(self.path, replace_cd, self.make_cd('s1.pkl', {}))
+
+        local = self.make_cd('r2.pkl', {'dover': ('999', ''), 'kent': ('222', '')})
+        geodb = sqlite3.connect(':memory:')
+        geodb.execute('CREATE TABLE geodata (geoid TEXT)')
+        geodb.execute('CREATE TABLE admin (geoid TEXT)')
+        geodb.execute("INSERT INTO admin VALUES ('111')")
+
+        result = CacheExport.import_caches(self.path, local, self.make_cd('s2.pkl', {}), geodb_conn=geodb)
+        self.assertEqual([('dover', ('999', ''), ('111', ''))], result.conflicts)
+        self.assertEqual(1, result.unchanged)
+        self.assertEqual([('paris', '333')], result.invalid)
+        self.assertEqual(('999', ''), local.dict['dover'])
+
+        result = CacheExport.import_caches(self.path, local, self.make_cd('s3.pkl', {}), geodb_conn=geodb,
+                                           overwrite=True)
+        self.assertEqual(1, result.overwritten)
+        self.assertEqual(('111', ''), local.dict['dover'])
+
+
+if __name__ == '__main__':
+    unittest.main()
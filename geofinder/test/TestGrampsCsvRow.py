@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import math
+import pickle
+import unittest
+
+from geofinder import GrampsCsv
+
+
+class TestGrampsCsvRow(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.row = GrampsCsv.CsvRow('P0001', 'Dover, Kent, England', 'Dover', 51.12346, 1.31678, 'PPL', 'ENG',
+                                    'G5', 'GB', 'P0002', 'City')
+
+    def test_pickle(self):
+        row = pickle.loads(pickle.dumps(self.row))
+        for name in GrampsCsv.CsvRow.__slots__:
+            self.assertEqual(getattr(self.row, name), getattr(row, name))
+
+    def test_raw_text_kept(self):
+        # Enclosures are looked up from the title as found.  Title Case is only used in the CSV file
+        row = GrampsCsv.CsvRow('P0003', "st. mary's, kent, england", "st. mary's", 51.0, 1.0, 'PPL', 'ENG', 'G5',
+                               'GB', '', 'City')
+        self.assertEqual("st. mary's, kent, england", row.title)
+        self.assertEqual("[P0003],\"St. Mary's, Kent, England\",\"St. Mary's\",City,51.0000,1.0000,,\n", row.csv_line())
+
+    def test_csv_line(self):
+        self.assertEqual('[P0001],"Dover, Kent, England","Dover",City,51.1235,1.3168,[P0002],\n', self.row.csv_line())
+
+    def test_csv_line_nan(self):
+        # Missing lat/lon are written as a space and no enclosure is blank
+        self.row.lat = math.nan
+        self.row.enclosed_by = ''
+        self.assertEqual('[P0001],"Dover, Kent, England","Dover",City, , ,,\n', self.row.csv_line())
+
+    def test_csv_line_quote(self):
+        # Quotes in title or name are doubled
+        self.row.title = 'The "Old" Inn, Dover'
+        self.assertEqual('[P0001],"The ""Old"" Inn, Dover","Dover",City,51.1235,1.3168,[P0002],\n',
+                         self.row.csv_line())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+
+import sqlite3
+import unittest
+
+from geofinder.ancestry import GrampsXml
+
+# name (normalized as in geodata.db), country, admin1_id, admin2_id, geoid
+ROWS = [('springfield', 'us', 'IL', '167', 'g1'),
+        ('springfield', 'us', 'MA', '013', 'g2'),
+        ('springfield', 'us', 'MA', '013', 'g2'),    # Same GEOID twice counts as one place
+        ('riverside', 'us', 'CA', '065', 'g3'),
+        ('riverside', 'us', 'CA', '071', 'g4'),
+        ('st mary', 'gb', 'ENG', 'K2', 'g5')]
+
+
+class TestLookupInScope(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute('CREATE TABLE geodata (id integer primary key autoincrement not null, name text, '
+                          'country text, admin1_id text, admin2_id text, lat text, lon text, f_code text, '
+                          'geoid text, sdx text)')
+        self.conn.executemany('INSERT INTO geodata(name, country, admin1_id, admin2_id, geoid) VALUES (?,?,?,?,?)',
+                              ROWS)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_unique_in_admin1(self):
+        # Springfield is in two states but only once in Illinois
+        self.assertEqual('g1', GrampsXml.lookup_in_scope(self.conn, 'Springfield', ('us', 'IL', '')))
+        self.assertEqual('g2', GrampsXml.lookup_in_scope(self.conn, 'Springfield', ('us', 'MA', '')))
+
+    def test_not_unique(self):
+        # Full lookup is needed if the name isn't unique in the scope
+        self.assertEqual('', GrampsXml.lookup_in_scope(self.conn, 'Springfield', ('us', '', '')))
+        self.assertEqual('', GrampsXml.lookup_in_scope(self.conn, 'Riverside', ('us', 'CA', '')))
+
+    def test_admin2(self):
+        self.assertEqual('g4', GrampsXml.lookup_in_scope(self.conn, 'Riverside', ('us', 'CA', '071')))
+
+    def test_miss(self):
+        self.assertEqual('', GrampsXml.lookup_in_scope(self.conn, 'Springfield', ('us', 'CA', '')))
+        self.assertEqual('', GrampsXml.lookup_in_scope(self.conn, 'Springfield', ('', '', '')))
+
+    def test_normalized_name(self):
+        self.assertEqual('g5', GrampsXml.lookup_in_scope(self.conn, 'St. Mary', ('gb', 'ENG', '')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import gzip
+import io
+import unittest
+
+from geofinder.util import OutputWriter
+
+
+class TestOutputWriter(unittest.TestCase):
+
+    def test_plain(self):
+        raw = io.BytesIO()
+        close = raw.close
+        raw.close = lambda: None  # Keep buffer readable after close
+        writer = OutputWriter.OutputWriter(raw, block_size=10)
+        for idx in range(20):
+            writer.write(f'line {idx}\n')
+        writer.close()
+        self.assertEqual(''.join(f'line {idx}\n' for idx in range(20)), raw.getvalue().decode('utf-8'))
+        close()
+
+    def test_gzip_multi_member(self):
+        raw = io.BytesIO()
+        raw.close = lambda: None
+        text = ''.join(f'0 @I{idx}@ INDI\n1 PLAC Paris, France\n' for idx in range(5000))
+        writer = OutputWriter.OutputWriter(raw, compress=True, block_size=1000, threads=2)
+        for line in text.splitlines(keepends=True):
+            writer.write(line)
+        writer.close()
+        data = raw.getvalue()
+        # Each block is a separate GZIP member
+        self.assertGreater(data.count(b'\x1f\x8b\x08'), 1)
+        self.assertEqual(text, gzip.decompress(data).decode('utf-8'))
+
+    def test_close_twice(self):
+        raw = io.BytesIO()
+        writer = OutputWriter.OutputWriter(raw, compress=True)
+        writer.write('0 HEAD\n')
+        writer.close()
+        self.assertTrue(raw.closed)
+        writer.close()
+        writer.flush()
+
+
+if __name__ == '__main__':
+    unittest.main()
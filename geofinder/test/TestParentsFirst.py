@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import unittest
+import xml.etree.ElementTree as Tree
+
+from geofinder.ancestry import GrampsXml
+
+
+def placeobj(handle: str, parent: str = None) -> Tree.Element:
+    plac = Tree.Element('placeobj', handle=handle)
+    Tree.SubElement(plac, 'ptitle').text = handle
+    if parent is not None:
+        Tree.SubElement(plac, 'placeref', hlink=parent)
+    return plac
+
+
+def handles(places) -> list:
+    return [plac.get('handle') for plac in places]
+
+
+class TestParentsFirst(unittest.TestCase):
+
+    def test_order(self):
+        # City before county before state in file
+        places = [placeobj('city', 'county'), placeobj('other'), placeobj('county', 'state'), placeobj('state'),
+                  placeobj('church', 'city')]
+        ordered = GrampsXml.parents_first(places)
+        self.assertEqual(['state', 'county', 'city', 'other', 'church'], handles(ordered))
+
+    def test_missing_parent(self):
+        # Enclosing place isn't in the file
+        ordered = GrampsXml.parents_first([placeobj('city', 'unknown'), placeobj('town')])
+        self.assertEqual(['city', 'town'], handles(ordered))
+
+    def test_cycle(self):
+        # Each place is returned once even if the enclosures form a cycle
+        places = [placeobj('a', 'b'), placeobj('b', 'c'), placeobj('c', 'a'), placeobj('d', 'a')]
+        ordered = GrampsXml.parents_first(places)
+        self.assertEqual(['c', 'b', 'a', 'd'], handles(ordered))
+
+
+if __name__ == '__main__':
+    unittest.main()
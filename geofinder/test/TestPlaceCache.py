@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import tempfile
+import unittest
+
+from geofinder.util import PlaceCache, SqliteDictionary
+
+ENTRY = ('1571234', 'Dover, Kent', 'Dover', 'Dover, Kent, England, United Kingdom', 'Dover', '51.1', '1.3', None,
+         (('dover, kent', None),))
+
+
+class TestPlaceCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        self.replace_cd = SqliteDictionary.SqliteDictionary(self.directory, 'global_replace.pkl')
+        self.replace_cd.read()
+
+    def tearDown(self) -> None:
+        self.replace_cd.close()
+        self.tmp.cleanup()
+
+    def new_cache(self, stamp='1') -> PlaceCache.PlaceCache:
+        return PlaceCache.PlaceCache(self.directory, 'test.gramps.places.pkl', stamp=stamp, replace_cd=self.replace_cd)
+
+    def save(self, entry=ENTRY, stamp='1'):
+        cache = self.new_cache(stamp)
+        cache.add('_h1', entry)
+        cache.end_of_file()
+        cache.write()
+
+    def test_unchanged(self):
+        cache = self.new_cache()
+        self.assertIsNone(cache.lookup('_h1', '1571234', 'Dover, Kent', 'Dover'))
+        cache.add('_h1', ENTRY)
+        cache.end_of_file()
+        cache.write()
+
+        cache = self.new_cache()
+        # Same input, or the output of the previous run was imported
+        self.assertEqual(ENTRY, cache.lookup('_h1', '1571234', 'Dover, Kent', 'Dover'))
+        self.assertEqual(ENTRY, cache.lookup('_h1', '1571234', 'Dover, Kent, England, United Kingdom', 'Dover'))
+        # Changed
+        self.assertIsNone(cache.lookup('_h1', '1579999', 'Dover, Kent', 'Dover'))
+        self.assertIsNone(cache.lookup('_h1', '1571234', 'Dover, Delaware', 'Dover'))
+        self.assertEqual(2, cache.reused_count)
+
+    def test_dropped_places(self):
+        cache = self.new_cache()
+        cache.add('_h1', ENTRY)
+        cache.add('_h2', ENTRY)
+        cache.end_of_file()
+        cache.write()
+
+        # Stopped early.  Places not reached are kept
+        cache = self.new_cache()
+        cache.lookup('_h1', '1571234', 'Dover, Kent', 'Dover')
+        cache.write()
+        self.assertEqual({'_h1', '_h2'}, set(self.new_cache().previous) - {PlaceCache.STAMP_KEY})
+
+        # Complete run.  Places no longer in file are dropped
+        cache = self.new_cache()
+        cache.lookup('_h1', '1571234', 'Dover, Kent', 'Dover')
+        cache.end_of_file()
+        cache.write()
+        self.assertEqual({'_h1'}, set(self.new_cache().previous) - {PlaceCache.STAMP_KEY})
+
+    def test_stamp_changed(self):
+        self.save(stamp='1')
+        self.assertIsNone(self.new_cache(stamp='2').lookup('_h1', '1571234', 'Dover, Kent', 'Dover'))
+        self.assertEqual(ENTRY, self.new_cache(stamp='1').lookup('_h1', '1571234', 'Dover, Kent', 'Dover'))
+
+    def test_replacement_changed(self):
+        # Place had no global replace entry.  One was added
+        self.save()
+        self.replace_cd.dict['dover, kent'] = ('2654410', '')
+        self.assertIsNone(self.new_cache().lookup('_h1', '1571234', 'Dover, Kent', 'Dover'))
+
+        # Place used a global replace entry.  It was changed, then deleted
+        entry = ENTRY[:PlaceCache.PlaceEntry.REPLACE] + ((('dover, kent', ('2654410', '')),),)
+        self.save(entry)
+        self.assertEqual(entry, self.new_cache().lookup('_h1', '1571234', 'Dover, Kent', 'Dover'))
+        self.replace_cd.dict['dover, kent'] = ('4757111', '')
+        self.assertIsNone(self.new_cache().lookup('_h1', '1571234', 'Dover, Kent', 'Dover'))
+        del self.replace_cd.dict['dover, kent']
+        self.assertIsNone(self.new_cache().lookup('_h1', '1571234', 'Dover, Kent', 'Dover'))
+
+    def test_older_entry(self):
+        # Saved by an older version without the global replace lookups
+        self.save(ENTRY[:PlaceCache.PlaceEntry.REPLACE])
+        self.assertIsNone(self.new_cache().lookup('_h1', '1571234', 'Dover, Kent', 'Dover'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import tempfile
+import unittest
+
+from geofinder.util import RecordCache, SqliteDictionary
+
+RECORD = '0 @I1@ INDI\n1 BIRT\n2 PLAC Dover, Kent, England\n'
+OUTPUT = '0 @I1@ INDI\n1 BIRT\n2 PLAC Dover, Kent, England, United Kingdom\n'
+
+
+class TestRecordCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        self.replace_cd = SqliteDictionary.SqliteDictionary(self.directory, 'global_replace.pkl')
+        self.replace_cd.read()
+        self.replace_cd.dict['dover, kent, england'] = ('100', '')
+
+    def tearDown(self) -> None:
+        self.replace_cd.close()
+        self.tmp.cleanup()
+
+    def run_file(self, records, stamp='1', used=None) -> list:
+        # Process records and return the output reused for each record
+        cache = RecordCache.RecordCache(self.directory, 'test.ged.records.pkl', stamp=stamp, replace_cd=self.replace_cd)
+        reused = []
+        for record_id, text, output, resolved in records:
+            prev = cache.start_record(record_id, text)
+            reused.append(prev)
+            if prev is None:
+                cache.add_output(output)
+                if used is not None:
+                    cache.add_replacement(used, self.replace_cd.dict[used])
+                if not resolved:
+                    cache.invalidate()
+        cache.end_of_file()
+        cache.write()
+        return reused
+
+    def test_reuse_unchanged(self):
+        records = [('@I1@', RECORD, OUTPUT, True), ('@I2@', '0 @I2@ INDI\n', '0 @I2@ INDI\n', False)]
+        self.assertEqual([None, None], self.run_file(records))
+        # Unresolved record is processed again
+        self.assertEqual([OUTPUT, None], self.run_file(records))
+        # Changed record is processed again
+        self.assertEqual([None], self.run_file([('@I1@', RECORD + '1 DEAT\n', OUTPUT, True)]))
+
+    def test_stamp_changed(self):
+        records = [('@I1@', RECORD, OUTPUT, True)]
+        self.run_file(records, stamp='1')
+        self.assertEqual([None], self.run_file(records, stamp='2'))
+        self.assertEqual([OUTPUT], self.run_file(records, stamp='2'))
+
+    def test_replacement_changed(self):
+        records = [('@I1@', RECORD, OUTPUT, True)]
+        self.run_file(records, used='dover, kent, england')
+        self.assertEqual([OUTPUT], self.run_file(records))
+        # Edit entry
+        self.replace_cd.dict['dover, kent, england'] = ('200', '')
+        self.assertEqual([None], self.run_file(records, used='dover, kent, england'))
+        # Delete entry
+        del self.replace_cd.dict['dover, kent, england']
+        self.assertEqual([None], self.run_file(records))
+
+    def test_stopped_early(self):
+        cache = RecordCache.RecordCache(self.directory, 'test.ged.records.pkl', stamp='1')
+        cache.start_record('@I1@', RECORD)
+        cache.add_output(OUTPUT)
+        cache.write()
+        # Not at end of file.  Previous entries are kept
+        self.assertEqual([OUTPUT], self.run_file([('@I1@', RECORD, OUTPUT, True)]))
+
+
+if __name__ == '__main__':
+    unittest.main()
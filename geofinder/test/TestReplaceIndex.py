@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import unittest
+
+from geofinder import ReplaceIndex
+
+
+class TestReplaceIndex(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dct = {'st mary, kent co , england': ('100', ''),
+                    'springfield, sangamon county, illinois, usa': ('200', ''),
+                    'salem, oregon, usa': ('300', ''),
+                    'dover, kent county, delaware, usa': ('400', ''),
+                    'dover, kent, delaware, usa': ('400', ''),
+                    'paris, bourbon county, kentucky, usa': ('500', ''),
+                    'paris, henry county, kentucky, usa': ('600', '')}
+        self.index = ReplaceIndex.VariantIndex(self.dct)
+
+    def test_canonical(self):
+        self.assertEqual('st mary, kent county, england', ReplaceIndex.canonical('st mary, kent co , england'))
+        self.assertEqual('smith township, ohio', ReplaceIndex.canonical('smith twp,ohio'))
+
+    def test_spacing_and_abbreviation(self):
+        self.assertEqual(('st mary, kent co , england', ('100', '')),
+                         self.index.lookup('st mary,kent county, england'))
+
+    def test_missing_county(self):
+        # Lookup is missing county
+        self.assertEqual('200', self.index.lookup('springfield, illinois, usa')[1][0])
+        # Stored key is missing county
+        self.assertEqual('300', self.index.lookup('salem, marion county, oregon, usa')[1][0])
+        # Different county doesn't match
+        self.assertEqual((None, None), self.index.lookup('springfield, cook county, illinois, usa'))
+
+    def test_ambiguous(self):
+        # Two stored keys with same replacement is OK
+        self.assertEqual('400', self.index.lookup('dover, delaware, usa')[1][0])
+        # Two different replacements is ambiguous
+        self.assertEqual((None, None), self.index.lookup('paris, kentucky, usa'))
+
+    def test_add_and_remove(self):
+        self.index.build()
+        self.dct['austin, travis co, texas, usa'] = ('700', '')
+        self.index.add('austin, travis co, texas, usa')
+        self.assertEqual('700', self.index.lookup('austin, texas, usa')[1][0])
+        del self.dct['salem, oregon, usa']
+        self.assertEqual((None, None), self.index.lookup('salem, oregon, usa'))
+
+    def test_dropped_part_is_town(self):
+        # prefix, town, state, country.  Town is not dropped
+        self.dct['st paul church, springfield, illinois, usa'] = ('900', '')
+        self.assertEqual((None, None), self.index.lookup('st paul church, illinois, usa'))
+        self.assertIsNone(ReplaceIndex.drop_county('st paul church, springfield, illinois, usa'))
+
+    def test_county_names(self):
+        # Kent has no county suffix.  It is only dropped once it is a known admin2 name
+        self.dct.pop('dover, kent county, delaware, usa')
+        self.assertEqual((None, None), self.index.lookup('dover, delaware, usa'))
+        self.index.set_county_names({'kent'})
+        self.assertEqual('400', self.index.lookup('dover, delaware, usa')[1][0])
+
+    def test_delete_entry_exact_only(self):
+        self.dct['unknown, kent, delaware, usa'] = ('', '')
+        self.assertEqual((None, None), self.index.lookup('unknown, kent county, delaware, usa'))
+
+
+class TestNgramIndex(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dct = {'st mary, kent county, england': ('100', ''),
+                    'springfield, sangamon county, illinois, usa': ('200', ''),
+                    'salem, marion county, oregon, usa': ('300', ''),
+                    'salisbury, wiltshire, england': ('800', ''),
+                    'unknown, kent, delaware, usa': ('', '')}
+        self.index = ReplaceIndex.NgramIndex(self.dct)
+
+    def test_typo_variant(self):
+        res = self.index.similar('springfeild, sangamon county, illinois, usa')
+        self.assertEqual('springfield, sangamon county, illinois, usa', res[0][1])
+        self.assertEqual(('200', ''), res[0][2])
+
+    def test_ranking_and_threshold(self):
+        res = self.index.similar('salem, marion co, oregon, usa', min_score=0.1)
+        self.assertEqual('salem, marion county, oregon, usa', res[0][1])
+        scores = [score for score, key, entry in res]
+        self.assertEqual(sorted(scores, reverse=True), scores)
+        self.assertEqual([], self.index.similar('zzqx, yyqv', min_score=0.6))
+
+    def test_skips_exact_key(self):
+        res = self.index.similar('st mary, kent county, england')
+        self.assertNotIn('st mary, kent county, england', [key for score, key, entry in res])
+
+    def test_add(self):
+        self.index.build()
+        self.dct['austin, travis county, texas, usa'] = ('700', '')
+        self.index.add('austin, travis county, texas, usa')
+        self.assertEqual('700', self.index.similar('austen, travis county, texas, usa')[0][2][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from geofinder import ReplacementDictionary
+from geofinder.util import SqliteDictionary
+
+
+class TestRevalidate(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        self.geodb = self.build_geodb(['100', '200'])
+        self.replace_cd = SqliteDictionary.SqliteDictionary(self.directory, 'global_replace.pkl')
+        self.replace_cd.read()
+        self.replace_cd.dict.update({'dover': ('100', ''), 'paris': ('300', ''), 'deleted': ('', '')})
+        self.replace_cd.write()
+
+    def tearDown(self) -> None:
+        self.geodb.close()
+        self.replace_cd.close()
+        self.tmp.cleanup()
+
+    def build_geodb(self, geoids):
+        path = os.path.join(self.directory, 'geodata.db')
+        if os.path.exists(path):
+            os.remove(path)
+        conn = sqlite3.connect(path)
+        conn.execute('CREATE TABLE geodata (geoid TEXT)')
+        conn.execute('CREATE TABLE admin (geoid TEXT)')
+        conn.executemany('INSERT INTO geodata VALUES (?)', [(geoid,) for geoid in geoids])
+        conn.commit()
+        return conn
+
+    def test_quarantine_and_restore(self):
+        quarantined, restored, path = ReplacementDictionary.revalidate_cache(self.directory, self.replace_cd,
+                                                                             self.geodb)
+        self.assertEqual([('paris', '300')], quarantined)
+        self.assertEqual({'dover': ('100', ''), 'deleted': ('', '')}, dict(self.replace_cd.dict))
+        with open(path, encoding='utf-8') as file:
+            self.assertEqual('QUARANTINED\tparis\t300\n', file.read())
+
+        # Same database - nothing is checked
+        self.assertEqual(([], []), ReplacementDictionary.revalidate_cache(self.directory, self.replace_cd,
+                                                                          self.geodb)[:2])
+
+        # Rebuilt database has 300 again
+        self.geodb.close()
+        self.geodb = self.build_geodb(['100', '200', '300'])
+        quarantined, restored, path = ReplacementDictionary.revalidate_cache(self.directory, self.replace_cd,
+                                                                             self.geodb)
+        self.assertEqual([], quarantined)
+        self.assertEqual([('paris', '300')], restored)
+        self.assertEqual(('300', ''), self.replace_cd.get('paris'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import os
+import tempfile
+import unittest
+
+from geofinder.util import CachedDictionary, FileLock, SqliteDictionary
+
+
+class TestSharedCache(unittest.TestCase):
+    """ Two processes sharing a cache directory, simulated with two instances of each store """
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_pickle_merge(self):
+        first = CachedDictionary.CachedDictionary(self.directory, 'output_list.pkl', merge=True)
+        first.read()
+        first.dict.update({'a': '1', 'b': '2'})
+        first.write()
+
+        second = CachedDictionary.CachedDictionary(self.directory, 'output_list.pkl', merge=True)
+        second.read()
+        first.set('c', '3')
+        first.dict.pop('a')
+        first.write()
+        second.set('d', '4')
+        second.set('b', '22')
+        second.write()
+
+        # Second write kept first's changes and picked them up
+        self.assertEqual({'b': '22', 'c': '3', 'd': '4'}, second.dict)
+        first.read()
+        self.assertEqual({'b': '22', 'c': '3', 'd': '4'}, first.dict)
+        # Lock file is kept out of the cache directory listing
+        self.assertEqual(['locks', 'output_list.pkl'], sorted(os.listdir(self.directory)))
+        self.assertEqual(['output_list.pkl.lock'], os.listdir(os.path.join(self.directory, FileLock.LOCK_DIR)))
+
+    def test_lock_timeout(self):
+        path = os.path.join(self.directory, 'test.pkl')
+        with FileLock.FileLock(path):
+            with self.assertRaises(OSError):
+                FileLock.FileLock(path, timeout=0.1).acquire()
+
+    def test_sqlite_shared(self):
+        first = SqliteDictionary.SqliteDictionary(self.directory, 'global_replace.pkl')
+        first.read()
+        second = SqliteDictionary.SqliteDictionary(self.directory, 'global_replace.pkl')
+        second.read()
+        self.assertEqual(0, len(second.dict))
+        first.set('dover', '1')
+        first.write()
+        second.set('paris', '2')
+        second.write()
+
+        self.assertIsNone(second.get('dover'))
+        self.assertEqual('1', second.get_stored('dover'))
+        first.close()
+        second.close()
+        third = SqliteDictionary.SqliteDictionary(self.directory, 'global_replace.pkl')
+        third.read()
+        self.assertEqual({'dover': '1', 'paris': '2'}, dict(third.dict))
+        third.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
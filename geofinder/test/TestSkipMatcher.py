@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import unittest
+
+from geofinder import SkipMatcher
+
+
+class TestSkipMatcher(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.skip_dct = {'At Sea': ' ', 'glob:unknown*': ' ', 're:.*hospital.*': ' ', 'glob:st ?ary, *': ' ',
+                         'st. mary?': ' ', '*unknown*': ' '}
+        self.matcher = SkipMatcher.SkipMatcher(self.skip_dct)
+
+    def test_exact(self):
+        self.assertTrue(self.matcher.match('At Sea'))
+        self.assertFalse(self.matcher.match('At Sea, England'))
+
+    def test_glob(self):
+        self.assertTrue(self.matcher.match('Unknown, Texas'))
+        self.assertTrue(self.matcher.match('st mary, kent'))
+        self.assertFalse(self.matcher.match('Paris, Unknown'))
+
+    def test_legacy_key_is_literal(self):
+        # Keys without glob: or re: are exact names, even with * or ?
+        self.assertTrue(self.matcher.match('st. mary?'))
+        self.assertFalse(self.matcher.match('st. marys'))
+        self.assertTrue(self.matcher.match('*unknown*'))
+        self.assertFalse(self.matcher.match('place unknown here'))
+        self.assertFalse(SkipMatcher.is_pattern('*unknown*'))
+
+    def test_regex(self):
+        self.assertTrue(self.matcher.match('City Hospital, Boston'))
+        self.assertFalse(self.matcher.match('Boston, Suffolk, Massachusetts'))
+
+    def test_invalid_pattern(self):
+        self.skip_dct['re:(unclosed'] = ' '
+        self.matcher.build()
+        self.assertEqual(3, self.matcher.pattern_count)
+        self.assertTrue(self.matcher.match('unknown'))
+
+    def test_regex_flags_and_groups(self):
+        # Each is valid alone but not when joined into one regular expression
+        self.skip_dct['re:(?i)at sea.*'] = ' '
+        self.skip_dct['re:(?P<name>\\w+) farm, (?P=name)'] = ' '
+        self.skip_dct['re:(?P<name>\\w+) mill'] = ' '
+        self.matcher.build()
+        self.assertEqual(6, self.matcher.pattern_count)
+        self.assertTrue(self.matcher.match('At Sea, Atlantic'))
+        self.assertTrue(self.matcher.match('smith farm, smith'))
+        self.assertFalse(self.matcher.match('smith farm, jones'))
+        self.assertTrue(self.matcher.match('jones mill'))
+        self.assertTrue(self.matcher.match('Unknown, Texas'))
+
+    def test_numbered_backreference(self):
+        # Backreference numbers must not shift when there are other patterns
+        self.skip_dct['re:(\\w+) (\\w+), \\2'] = ' '
+        self.matcher.build()
+        self.assertTrue(self.matcher.match('old mill, mill'))
+        self.assertFalse(self.matcher.match('old mill, old'))
+
+    def test_rebuild(self):
+        self.skip_dct['glob:* farm'] = ' '
+        self.assertFalse(self.matcher.match('Smith Farm'))
+        self.matcher.build()
+        self.assertTrue(self.matcher.match('Smith Farm'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import unittest
+
+from geofinder.util import SpillDictionary
+
+
+class TestSpillDictionary(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dct = SpillDictionary.SpillDictionary(max_rows=3)
+        for idx in range(10):
+            self.dct[f'K{idx}'] = [idx]
+
+    def tearDown(self) -> None:
+        self.dct.close()
+
+    def test_spill(self):
+        self.assertEqual(3, len(self.dct.memory))
+        self.assertEqual(7, self.dct.spill_count)
+        self.assertEqual(10, len(self.dct))
+        self.assertEqual([7], self.dct['K7'])
+        self.assertIn('K9', self.dct)
+        self.assertNotIn('K10', self.dct)
+        self.assertIsNone(self.dct.get('K10'))
+        with self.assertRaises(KeyError):
+            _ = self.dct['K10']
+
+    def test_iterate(self):
+        self.assertEqual([f'K{idx}' for idx in range(10)], list(self.dct))
+
+    def test_update_on_disk(self):
+        # Value on disk is a copy.  Store it again to update it
+        row = self.dct['K8']
+        row.append('x')
+        self.assertEqual([8], self.dct['K8'])
+        self.dct['K8'] = row
+        self.assertEqual([8, 'x'], self.dct['K8'])
+        self.assertEqual(10, len(self.dct))
+        self.assertNotIn('K8', self.dct.memory)
+
+    def test_update_while_iterating(self):
+        for key in self.dct:
+            self.dct[key] = self.dct[key] + [key]
+        self.assertEqual([5, 'K5'], self.dct['K5'])
+        self.assertEqual(10, len(self.dct))
+
+    def test_close(self):
+        self.dct.close()
+        self.assertEqual(0, len(self.dct))
+        self.assertIsNone(self.dct.conn)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import os
+import pickle
+import sqlite3
+import tempfile
+import unittest
+
+from geofinder.util import SqliteDictionary
+
+
+class TestSqliteDictionary(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def reopen(self, cd):
+        cd.close()
+        cd = SqliteDictionary.SqliteDictionary(self.directory, 'test.pkl')
+        cd.read()
+        return cd
+
+    def test_set_write_read(self):
+        cd = SqliteDictionary.SqliteDictionary(self.directory, 'test.pkl')
+        self.assertTrue(cd.read(), 'new database is missing')
+        cd.set('dover, kent', '@123@')
+        cd.dict['paris'] = '@456@'
+        self.assertFalse(cd.write())
+        cd = self.reopen(cd)
+        self.assertEqual({'dover, kent': '@123@', 'paris': '@456@'}, dict(cd.dict))
+
+    def test_only_changes_written(self):
+        cd = SqliteDictionary.SqliteDictionary(self.directory, 'test.pkl')
+        cd.read()
+        cd.dict.update({'a': '1', 'b': '2', 'c': '3'})
+        cd.write()
+        self.assertEqual(set(), cd.dict.dirty)
+        cd.dict.pop('a')
+        del cd.dict['b']
+        cd.set('d', '4')
+        self.assertEqual({'d'}, cd.dict.dirty)
+        self.assertEqual({'a', 'b'}, cd.dict.deleted)
+        cd.write()
+        cd = self.reopen(cd)
+        self.assertEqual({'c': '3', 'd': '4'}, dict(cd.dict))
+
+    def test_replace_dict(self):
+        cd = SqliteDictionary.SqliteDictionary(self.directory, 'test.pkl')
+        cd.read()
+        cd.dict.update({'a': '1', 'b': '2'})
+        cd.write()
+        cd.dict = {'x': '9'}
+        cd.write()
+        cd = self.reopen(cd)
+        self.assertEqual({'x': '9'}, dict(cd.dict))
+
+    def test_migrate_pickle(self):
+        with open(os.path.join(self.directory, 'test.pkl'), 'wb') as file:
+            pickle.dump({'dover': '@1@', 'kent': '@2@pre'}, file)
+        cd = SqliteDictionary.SqliteDictionary(self.directory, 'test.pkl')
+        self.assertFalse(cd.read())
+        self.assertEqual({'dover': '@1@', 'kent': '@2@pre'}, dict(cd.dict))
+
+        # Pickle is not migrated again once database exists
+        cd.dict.clear()
+        cd.write()
+        cd = self.reopen(cd)
+        self.assertEqual({}, dict(cd.dict))
+
+    def test_usage_and_compact(self):
+        cd = SqliteDictionary.SqliteDictionary(self.directory, 'test.pkl')
+        cd.read()
+        cd.dict.update({'used': '1', 'unused': '2'})
+        cd.write()
+        for run in range(3):
+            cd = self.reopen(cd)
+            cd.start_run()
+            cd.record_hit('used')
+            cd.write()
+        self.assertEqual(3, cd.usage_stats()['run_count'])
+
+        # 'unused' was last seen when tracking started (run 1)
+        self.assertEqual(1, cd.compact(runs=2))
+        self.assertEqual({'used': '1'}, dict(cd.dict))
+        cd = self.reopen(cd)
+        self.assertEqual({'used': '1'}, dict(cd.dict))
+        self.assertEqual(1, cd.usage_stats()['archived'])
+
+        # Archived entry is restored on lookup
+        self.assertEqual('2', cd.get_stored('unused'))
+        cd.write()
+        cd = self.reopen(cd)
+        self.assertEqual({'used': '1', 'unused': '2'}, dict(cd.dict))
+        self.assertEqual(0, cd.usage_stats()['archived'])
+
+    def test_settings_tables(self):
+        # Each dictionary is a table in settings.db and the earlier skiplist.db is migrated
+        legacy = sqlite3.connect(os.path.join(self.directory, 'skiplist.db'))
+        legacy.execute('CREATE TABLE data (key TEXT PRIMARY KEY, value BLOB)')
+        legacy.execute('CREATE TABLE data_meta (key TEXT PRIMARY KEY, value TEXT)')
+        legacy.execute('INSERT INTO data VALUES (?, ?)', ('at sea', pickle.dumps(' ')))
+        legacy.execute("INSERT INTO data_meta VALUES ('format_version', '2')")
+        legacy.commit()
+        legacy.close()
+
+        skip_cd = SqliteDictionary.SqliteDictionary(self.directory, 'skiplist.pkl')
+        self.assertFalse(skip_cd.read())
+        self.assertEqual('2', skip_cd.get_meta('format_version'))
+        country_cd = SqliteDictionary.SqliteDictionary(self.directory, 'country_list.pkl')
+        self.assertTrue(country_cd.read())
+
+        # Table isn't loaded until it is used
+        self.assertIsNone(country_cd._dict)
+        country_cd.write()
+        self.assertEqual({'at sea': ' '}, dict(skip_cd.dict))
+        self.assertTrue(os.path.exists(os.path.join(self.directory, 'settings.db')))
+
+    def test_table_names_unique(self):
+        first = SqliteDictionary.SqliteDictionary(self.directory, 'a.pkl', table='person_my-tree.ged')
+        second = SqliteDictionary.SqliteDictionary(self.directory, 'b.pkl', table='person_my_tree.ged')
+        self.assertNotEqual(first.table, second.table)
+        first.read()
+        first.dict['@I1@'] = 'Smith'
+        first.write()
+        second.read()
+        self.assertEqual({}, dict(second.dict))
+        # Names that are already valid are not changed
+        self.assertEqual('skiplist', SqliteDictionary.SqliteDictionary(self.directory, 'skiplist.pkl').table)
+        first.close()
+        second.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
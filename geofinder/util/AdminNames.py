@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+import logging
+import sys
+
+
+class AdminNames:
+    """
+    In-memory country, admin1 and admin2 name tables loaded once from geodata.db.
+    Gives the same result as geodb.get_country_name(), get_admin1_name() and get_admin2_name()
+    without a database query for each lookup.  Only the supported countries are loaded.
+    """
+
+    def __init__(self, geodb, countries):
+        """
+        #Args:
+            geodb: geodata GeoDB
+            countries: List of supported country ISO codes.  If empty, all countries are loaded
+        """
+        self.logger = logging.getLogger(__name__)
+        self.geodb = geodb
+        self.countries = [iso.lower() for iso in countries]
+        self.country_dct = {}     # iso -> name
+        self.admin1_dct = {}      # (iso, admin1_id) -> name
+        self.admin2_dct = {}      # (iso, admin1_id, admin2_id) -> name
+        self.admin2_any_dct = {}  # (iso, admin2_id) -> name.  Used when admin1_id is blank
+
+    def load(self):
+        """ Load name tables from database """
+        if len(self.countries) > 0:
+            country_where = f" AND country IN ({','.join(['?'] * len(self.countries))})"
+        else:
+            country_where = ''
+        args = tuple(self.countries)
+
+        # Keep first row for each key, same as the database lookup
+        for name, iso in self._select('name, country', 'main.admin', "f_code = 'ADM0'" + country_where, args):
+            self.country_dct.setdefault(iso, name)
+        if 'us' in self.country_dct:
+            self.country_dct['us'] = 'United States'
+
+        for name, iso, admin1_id in self._select('name, country, admin1_id', 'main.admin',
+                                                 "f_code = 'ADM1'" + country_where, args):
+            self.admin1_dct.setdefault((iso, admin1_id), name)
+
+        for name, iso, admin1_id, admin2_id in self._select('name, country, admin1_id, admin2_id', 'main.geodata',
+                                                            "f_code = 'ADM2'" + country_where, args):
+            self.admin2_dct.setdefault((iso, admin1_id, admin2_id), name)
+            self.admin2_any_dct.setdefault((iso, admin2_id), name)
+
+        self.logger.info(f'Admin name tables: {len(self.country_dct)} countries, {len(self.admin1_dct)} admin1, '
+                         f'{len(self.admin2_dct)} admin2.  Memory={self.memory_size() // 1024} KB')
+
+    def _select(self, select_str, from_tbl, where, args) -> list:
+        # Use the connection directly.  geodb select adds the query LIMIT
+        cur = self.geodb.db.conn.cursor()
+        cur.execute(f'SELECT {select_str} FROM {from_tbl} WHERE {where}', args)
+        return cur.fetchall()
+
+    def memory_size(self) -> int:
+        """ Approximate memory used by name tables in bytes """
+        size = 0
+        for dct in [self.country_dct, self.admin1_dct, self.admin2_dct, self.admin2_any_dct]:
+            size += sys.getsizeof(dct)
+            for key, name in dct.items():
+                size += sys.getsizeof(key) + sys.getsizeof(name)
+        return size
+
+    def get_country_name(self, iso: str) -> str:
+        if len(iso) == 0:
+            return ''
+        return self.country_dct.get(iso, '')
+
+    def get_admin1_name(self, place) -> str:
+        """ Get admin1 name using place.admin1_id.  Place admin1_name is updated """
+        if len(place.admin1_id) == 0:
+            place.admin1_name = ''
+        else:
+            place.admin1_name = self.admin1_dct.get((place.country_iso, place.admin1_id), '')
+        return place.admin1_name
+
+    def get_admin2_name(self, place) -> str:
+        """ Get admin2 name using place.admin1_id and place.admin2_id.  Place admin2_name is updated """
+        if len(place.admin2_id) == 0:
+            place.admin2_name = ''
+        elif place.admin1_id != '':
+            place.admin2_name = self.admin2_dct.get((place.country_iso, place.admin1_id, place.admin2_id), '')
+        else:
+            place.admin2_name = self.admin2_any_dct.get((place.country_iso, place.admin2_id), '')
+        return place.admin2_name
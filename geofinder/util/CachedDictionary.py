@@ -23,15 +23,33 @@ import pickle
 from tkinter import messagebox
 from typing import Dict
 
+from geofinder.util import FileLock
+
 
 class CachedDictionary:
-    """ Use a Python Pickle file to maintain a cached dictionary """
+    """
+    Use a Python Pickle file to maintain a cached dictionary.
+
+    The file is written to a temporary file which then replaces the original, so a reader never sees a partial
+    file.  Writes hold an advisory lock (FileLock) so several GeoFinder processes can share a cache directory.
+    With merge=True, write() re-reads the file under the lock and applies only the keys this process added,
+    changed or deleted since its last read/write, so concurrent updates from other processes are kept.
+    After the write, dict also has the other processes' updates.
+    """
 
-    def __init__(self, cache_directory, fname):
+    def __init__(self, cache_directory, fname, merge: bool = False):
+        """
+        #Args:
+            cache_directory: Directory for Pickle file
+            fname: File name
+            merge: If True, merge our changes with the current file contents on write
+        """
         self.logger = logging.getLogger(__name__)
         self.cache_directory = cache_directory
         self.fname = fname
+        self.merge = merge
         self.dict: Dict[str, str] = {}
+        self.base: Dict[str, str] = {}  # Contents at last read/write.  Only kept for merge
         self.error = False
 
     def get(self, val):
@@ -50,16 +68,21 @@ class CachedDictionary:
         path = os.path.join(self.cache_directory, self.fname)
         if os.path.exists(path):
             with open(path, 'rb') as file:
-                self.dict = pickle.load(file)
-                self.logger.debug(f'Read success CachedDict dir={self.cache_directory} fname={self.fname} len={len(self.dict)}')
-                self.error = False
-                return False
+                data = file.read()
+            self.dict = pickle.loads(data)
+            if self.merge:
+                # Separate copy to find our changes at write time
+                self.base = pickle.loads(data)
+            self.logger.debug(f'Read success CachedDict dir={self.cache_directory} fname={self.fname} len={len(self.dict)}')
+            self.error = False
+            return False
         else:
             self.logger.error("Missing {}".format(path))
             # Create empty file
             try:
-                with open(path, 'wb') as file:
-                    pickle.dump(self.dict, file)
+                with FileLock.FileLock(path):
+                    if not os.path.exists(path):
+                        self._write_file(path, pickle.dumps(self.dict))
             except OSError as e:
                 messagebox.showwarning('File Error',f'{e}')
             self.error = True
@@ -73,10 +96,39 @@ class CachedDictionary:
         self.logger.debug("Write {}".format(path))
 
         try:
-            with open(path, 'wb') as file:
-                pickle.dump(self.dict, file)
+            with FileLock.FileLock(path):
+                if self.merge:
+                    self._merge_file(path)
+                data = pickle.dumps(self.dict)
+                self._write_file(path, data)
         except OSError as e:
             messagebox.showwarning('File Write Error',e)
             return  True
 
+        if self.merge:
+            self.base = pickle.loads(data)
         return False
+
+    def _merge_file(self, path):
+        # Apply our changes since last read/write to the current file contents.  Caller holds the lock
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as file:
+            current = pickle.load(file)
+        for key in self.base:
+            if key not in self.dict:
+                current.pop(key, None)
+        for key, val in self.dict.items():
+            if key not in self.base or self.base[key] != val:
+                current[key] = val
+        # Update in place since callers may hold a reference to dict
+        self.dict.clear()
+        self.dict.update(current)
+
+    @staticmethod
+    def _write_file(path, data: bytes):
+        # Write to temp file and replace, so the file is never partially written
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
@@ -19,21 +19,20 @@
 
 import logging
 import os
-import pickle
 
 from tkinter import messagebox
 
 import tk_helper
 
 from geodata import GeoUtil
-from util import CachedDictionary
+from util import SqliteDictionary
 
 
 class Config:
     """ Read and set configuration parameters """
     def __init__(self, directory):
         self.logger = logging.getLogger(__name__)
-        self.config_cd: CachedDictionary
+        self.config_cd: SqliteDictionary.SqliteDictionary
         self.config_cd = None
 
         self.directory: str = directory
@@ -62,17 +61,15 @@ class Config:
             self.logger.warning(f"{self.cache_dir} folder not found.")
             tk_helper.fatal_error(f"{self.cache_dir} folder not found.  Please use Config button to correct")
 
-        self.config_cd = CachedDictionary.CachedDictionary(self.cache_dir, fname)
+        self.config_cd = SqliteDictionary.SqliteDictionary(self.cache_dir, fname)
         self.config_cd.read()
 
         if self.config_cd.error:
             self.logger.error(f'Config {os.path.join(self.cache_dir, fname)} not found')
 
             # Create empty config file
-            path = os.path.join(self.cache_dir, "config.pkl")
             self.set("gedcom_path", "GEDCOM filename: <empty>")
-            with open(path, 'wb') as file:
-                pickle.dump(self.config_cd.dict, file)
+            self.config_cd.write()
             return True
         else:
             return False
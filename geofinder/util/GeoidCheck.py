@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+import logging
+from typing import Iterable, Set
+
+BATCH_SIZE = 500
+
+
+def find_missing(conn, geoids: Iterable[str], batch_size: int = BATCH_SIZE) -> Set[str]:
+    """
+    Find the GEOIDs that are not in geodata.db.  GEOIDs are checked in batches with one IN query per batch
+    against main.geodata and main.admin instead of one lookup per GEOID
+    #Args:
+        conn: sqlite3 connection to geodata.db
+        geoids: GEOIDs to check
+        batch_size: Number of GEOIDs per query
+    #Returns:
+        Set of GEOIDs that were not found
+    """
+    logger = logging.getLogger(__name__)
+    missing = set(geoid for geoid in geoids if len(geoid) > 0)
+    total = len(missing)
+    for table in ['main.geodata', 'main.admin']:
+        pending = sorted(missing)
+        for idx in range(0, len(pending), batch_size):
+            batch = pending[idx:idx + batch_size]
+            cur = conn.execute(f"SELECT geoid FROM {table} WHERE geoid IN ({','.join(['?'] * len(batch))})", batch)
+            for row in cur:
+                missing.discard(str(row[0]))
+    logger.debug(f'GEOID check: {total} checked, {len(missing)} missing')
+    return missing
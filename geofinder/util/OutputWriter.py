@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+import gzip
+import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+BLOCK_SIZE = 1024 * 1024  # Coalesce writes into 1MB blocks
+COMPRESS_LEVEL = 6
+
+
+class OutputWriter:
+    """
+    Text output writer that coalesces small writes into large blocks before writing them to a binary file.
+
+    If compress is True, each block is compressed as an independent GZIP member on a pool of background threads.
+    zlib releases the GIL while compressing, so compression runs in parallel with matching.  Blocks are
+    written out in order.  A file of concatenated GZIP members is a valid GZIP file.
+    """
+
+    def __init__(self, raw, compress: bool = False, block_size: int = BLOCK_SIZE, threads: int = 0):
+        """
+        #Args:
+            raw: Binary file object to write to
+            compress: If True, write GZIP compressed output
+            block_size: Size of text to collect before writing (or compressing) a block
+            threads: Number of compression threads.  0 for default
+        """
+        self.logger = logging.getLogger(__name__)
+        self.raw = raw
+        self.compress = compress
+        self.block_size = block_size
+        self.parts = []
+        self.size = 0
+        self.pending = deque()  # Compression futures in output order
+        self.executor = None
+
+        if self.compress:
+            if threads == 0:
+                threads = min(4, os.cpu_count() or 1)
+            self.max_pending = threads * 2
+            self.executor = ThreadPoolExecutor(max_workers=threads)
+
+    def write(self, text: str) -> int:
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.block_size:
+            self._write_block()
+        return len(text)
+
+    def flush(self):
+        """ Write out all buffered text and wait for any compression in progress """
+        if self.raw is None:
+            return
+        self._write_block()
+        while self.pending:
+            self.raw.write(self.pending.popleft().result())
+        self.raw.flush()
+
+    def close(self):
+        """ Flush and close file.  Calling close again does nothing """
+        if self.raw is None:
+            return
+        self.flush()
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        self.raw.close()
+        self.raw = None
+
+    def _write_block(self):
+        if self.size == 0:
+            return
+        data = ''.join(self.parts).encode('utf-8')
+        self.parts = []
+        self.size = 0
+
+        if self.executor is None:
+            self.raw.write(data)
+            return
+
+        self.pending.append(self.executor.submit(gzip.compress, data, COMPRESS_LEVEL))
+        # Write out blocks that are done.  Wait if too many blocks are queued so memory stays bounded
+        while self.pending and (self.pending[0].done() or len(self.pending) > self.max_pending):
+            self.raw.write(self.pending.popleft().result())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+import logging
+from typing import Union
+
+from geofinder import ReplacementDictionary
+from util import CachedDictionary
+
+STAMP_KEY = '__stamp__'
+
+
+class PlaceEntry:
+    CHANGE = 0
+    IN_TITLE = 1
+    IN_NAME = 2
+    OUT_TITLE = 3
+    OUT_NAME = 4
+    LAT = 5
+    LON = 6
+    CSV = 7
+    REPLACE = 8
+
+
+class PlaceCache:
+    """
+    Keep the result for each Gramps place object so that the next run can reuse the result for places that
+    have not changed.
+
+    Key is the placeobj handle, value is a tuple indexed by PlaceEntry:  change stamp, input title and name,
+    output title and name, lat/lon, the CSV row (dict_idx, key, row) and the global replace lookups made for the
+    place.  Only places that were resolved are stored, so places that needed review are always processed again.
+
+    A place is processed again if a global replace lookup it made would now give a different entry.  All places
+    are processed again if the stamp (global replace format and geodata.db build) is different from the last run.
+    """
+
+    def __init__(self, cache_d, fname, stamp: str = '', replace_cd=None):
+        """
+        #Args:
+            cache_d: Cache directory
+            fname: Pickle file name
+            stamp: Identifies the global replace format and geodata.db build.  If this changes, nothing is reused
+            replace_cd: Global replace dictionary.  Used to check the global replace lookups made for a place
+        """
+        self.logger = logging.getLogger(__name__)
+        # Merge on write in case another process is working on the same file
+        self.place_cd = CachedDictionary.CachedDictionary(cache_d, fname, merge=True)
+        self.place_cd.read()
+        self.previous = self.place_cd.dict
+        self.stamp = stamp
+        self.replace_cd = replace_cd
+        if self.previous.get(STAMP_KEY) != stamp:
+            if len(self.previous) > 0:
+                self.logger.info(f'Place cache {fname} is from a different geodata or global replace version.  '
+                                 f'All places will be processed')
+            self.previous = {}
+        self.current = {}
+        self.complete = False
+        self.reused_count = 0
+        self.logger.debug(f'Place cache {fname} previous run has {len(self.previous)} places')
+
+    def lookup(self, handle: str, change: str, title: str, name: str) -> Union[tuple, None]:
+        """
+        Get result from previous run if place is unchanged.  Place is unchanged if the change stamp is the same and
+        the title and name are the same as the input or the output of the previous run (output was imported)
+        #Args:
+            handle: placeobj handle
+            change: placeobj change stamp
+            title: ptitle text
+            name: pname value
+        #Returns:
+            PlaceEntry tuple if place is unchanged, otherwise None
+        """
+        prev = self.previous.get(handle)
+        if prev is None or len(prev) <= PlaceEntry.REPLACE or prev[PlaceEntry.CHANGE] != change:
+            return None
+        if (title, name) not in [(prev[PlaceEntry.IN_TITLE], prev[PlaceEntry.IN_NAME]),
+                                 (prev[PlaceEntry.OUT_TITLE], prev[PlaceEntry.OUT_NAME])]:
+            return None
+        if self.replace_cd is not None and \
+                not ReplacementDictionary.replacements_unchanged(self.replace_cd, prev[PlaceEntry.REPLACE]):
+            return None
+
+        # Unchanged - carry entry forward to this run
+        self.current[handle] = prev
+        self.reused_count += 1
+        return prev
+
+    def add(self, handle: str, entry: tuple):
+        """ Save result for a place that was resolved in this run """
+        self.current[handle] = entry
+
+    def end_of_file(self):
+        """ Reached end of places.  Places that are no longer in the file will be dropped """
+        self.complete = True
+
+    def write(self):
+        """ Write out place dictionary for next run """
+        if self.complete:
+            dct = dict(self.current)
+        else:
+            # Run was stopped early.  Keep previous entries for places we didn't reach
+            dct = dict(self.previous)
+            dct.update(self.current)
+        dct[STAMP_KEY] = self.stamp
+        self.place_cd.dict = dct
+        self.logger.info(f'Place cache: reused {self.reused_count} places.  Saving {len(dct) - 1} places')
+        self.place_cd.write()
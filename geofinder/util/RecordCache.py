@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+import hashlib
+import logging
+from typing import Union
+
+from geofinder import ReplacementDictionary
+from util import CachedDictionary
+
+
+STAMP_KEY = '__stamp__'
+
+
+class RecordCache:
+    """
+    Keep a content hash and the output text for each record in an ancestry file so that the
+    next run can reuse the output of records that have not changed.
+
+    The dictionary is stored in the cache directory next to the person dictionary.  Key is the record ID,
+    value is (hash of input text, output text, global replace entries used).   Only records where every place
+    was resolved are stored, so records that needed review are always processed again.
+
+    A record is processed again if a global replace entry it used was changed or deleted.  All records are
+    processed again if the stamp (global replace format and geodata.db build) is different from the last run.
+    """
+
+    def __init__(self, cache_d, fname, stamp: str = '', replace_cd=None):
+        """
+        #Args:
+            cache_d: Cache directory
+            fname: Pickle file name
+            stamp: Identifies the global replace format and geodata.db build.  If this changes, nothing is reused
+            replace_cd: Global replace dictionary.  Used to check that replacements used by a record are unchanged
+        """
+        self.logger = logging.getLogger(__name__)
+        # Merge on write in case another process is working on the same file
+        self.record_cd = CachedDictionary.CachedDictionary(cache_d, fname, merge=True)
+        self.record_cd.read()
+        self.previous = self.record_cd.dict
+        self.stamp = stamp
+        self.replace_cd = replace_cd
+        if self.previous.get(STAMP_KEY) != stamp:
+            if len(self.previous) > 0:
+                self.logger.info(f'Record cache {fname} is from a different geodata or global replace version.  '
+                                 f'All records will be processed')
+            self.previous = {}
+        self.current = {}
+
+        self.record_id = None
+        self.record_hash = ''
+        self.output = []
+        self.replacements = []
+        self.cacheable = False
+        self.complete = False
+        self.reused_count = 0
+        self.logger.debug(f'Record cache {fname} previous run has {len(self.previous)} records')
+
+    def start_record(self, record_id: str, text: str) -> Union[str, None]:
+        """
+        Start a new record.  Finish the previous record.
+        #Args:
+            record_id: ID of record (label)
+            text: Full input text of record
+        #Returns:
+            Previous output text if record is unchanged since last run, otherwise None
+        """
+        self.end_record()
+        digest = hashlib.sha1(text.encode('utf-8', errors='replace')).hexdigest()
+        prev = self.previous.get(record_id)
+        if prev is not None and prev[0] == digest and self._replacements_unchanged(prev[2]):
+            # Unchanged - carry entry forward to this run
+            self.current[record_id] = prev
+            self.reused_count += 1
+            return prev[1]
+
+        # New or modified record.  Collect its output
+        self.record_id = record_id
+        self.record_hash = digest
+        self.cacheable = True
+        return None
+
+    def _replacements_unchanged(self, replacements) -> bool:
+        # Check that global replace lookups made for record give the same entries
+        if self.replace_cd is None:
+            return True
+        return ReplacementDictionary.replacements_unchanged(self.replace_cd, replacements)
+
+    def add_output(self, text: str):
+        """ Add text to output for current record """
+        if self.record_id is not None:
+            self.output.append(text)
+
+    def add_replacement(self, key: str, entry):
+        """ Current record looked up this global replace key.  Entry is None if there was no entry """
+        if self.record_id is not None:
+            self.replacements.append((key, entry))
+
+    def invalidate(self):
+        """ Current record had a place that was not resolved.  Don't store it """
+        self.cacheable = False
+
+    def end_record(self):
+        """ Finish current record and save its output if all places were resolved """
+        if self.record_id is not None and self.cacheable:
+            self.current[self.record_id] = (self.record_hash, ''.join(self.output), tuple(self.replacements))
+        self.record_id = None
+        self.output = []
+        self.replacements = []
+
+    def end_of_file(self):
+        """ Reached end of file.  Records that are no longer in the file will be dropped """
+        self.end_record()
+        self.complete = True
+
+    def write(self):
+        """ Write out record dictionary for next run """
+        self.end_record()
+        if self.complete:
+            dct = dict(self.current)
+        else:
+            # Run was stopped early.  Keep previous entries for records we didn't reach
+            dct = dict(self.previous)
+            dct.update(self.current)
+        dct[STAMP_KEY] = self.stamp
+        self.record_cd.dict = dct
+        self.logger.info(f'Record cache: reused {self.reused_count} records.  Saving {len(dct) - 1} records')
+        self.record_cd.write()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+import logging
+import pickle
+import sqlite3
+
+ITER_BATCH = 1000
+
+
+class SpillDictionary:
+    """
+    Dictionary that keeps up to max_rows entries in memory.  Entries beyond that are pickled into a
+    temporary SQLite database on disk, which is deleted when it is closed.
+    Values are copies once they are on disk:  after changing a value, store it again with dct[key] = value.
+
+    Iteration returns the keys in memory followed by the keys on disk.  Storing a value for an existing
+    key while iterating is allowed.
+    """
+
+    def __init__(self, max_rows: int):
+        """
+        #Args:
+            max_rows: Maximum number of entries to keep in memory
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_rows = max_rows
+        self.memory = {}
+        self.conn = None
+        self.spill_count = 0
+
+    def _open(self):
+        # '' is a private temporary database on disk
+        self.conn = sqlite3.connect('')
+        self.conn.execute('CREATE TABLE rows (key TEXT PRIMARY KEY, row BLOB)')
+        self.logger.info(f'Memory ceiling of {self.max_rows} rows reached.  Storing additional rows on disk')
+
+    def __setitem__(self, key, value):
+        if key in self.memory or (len(self.memory) < self.max_rows and self.get(key) is None):
+            self.memory[key] = value
+            return
+        if self.conn is None:
+            self._open()
+        cur = self.conn.execute('UPDATE rows SET row = ? WHERE key = ?', (pickle.dumps(value), key))
+        if cur.rowcount == 0:
+            self.conn.execute('INSERT INTO rows (key, row) VALUES (?, ?)', (key, pickle.dumps(value)))
+            self.spill_count += 1
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.conn is not None:
+            row = self.conn.execute('SELECT row FROM rows WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                return pickle.loads(row[0])
+        return default
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self.memory) + self.spill_count
+
+    def __iter__(self):
+        yield from list(self.memory)
+        if self.conn is None:
+            return
+        # Read keys on disk in batches
+        last_rowid = 0
+        while True:
+            batch = self.conn.execute('SELECT rowid, key FROM rows WHERE rowid > ? ORDER BY rowid LIMIT ?',
+                                      (last_rowid, ITER_BATCH)).fetchall()
+            if len(batch) == 0:
+                break
+            for last_rowid, key in batch:
+                yield key
+
+    def close(self):
+        """ Delete data on disk """
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        self.memory = {}
+        self.spill_count = 0
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+import hashlib
+import os
+import pickle
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from tkinter import messagebox
+
+from geofinder.util import CachedDictionary
+
+BUSY_TIMEOUT = 30.0
+# All settings dictionaries are tables in one database
+SETTINGS_DB = 'settings.db'
+
+
+class TrackedDict(dict):
+    """ Dictionary that keeps track of the keys that were changed or deleted since the last write """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dirty = set()
+        self.deleted = set()
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.dirty.add(key)
+        self.deleted.discard(key)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.dirty.discard(key)
+        self.deleted.add(key)
+
+    def pop(self, key, *args):
+        if key in self:
+            self.dirty.discard(key)
+            self.deleted.add(key)
+        return super().pop(key, *args)
+
+    def popitem(self):
+        key, value = super().popitem()
+        self.dirty.discard(key)
+        self.deleted.add(key)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        self.deleted.update(self.keys())
+        self.dirty.clear()
+        super().clear()
+
+    def mark_clean(self):
+        self.dirty.clear()
+        self.deleted.clear()
+
+
+class SqliteDictionary(CachedDictionary.CachedDictionary):
+    """
+    Drop-in replacement for CachedDictionary that is stored in SQLite instead of a Pickle file.
+    Each dictionary is a table in settings.db, so startup opens one file.  The same get/set/read/write API and
+    .dict are used.  read() only opens the database:  the table is loaded the first time dict is used, so
+    dictionaries that aren't needed are never deserialized.  write() only stores the keys that were changed or
+    deleted since the last write.  Each write is one transaction, so a crash leaves the previous contents.
+    The database uses WAL mode.
+
+    Several processes can share the database.  Write transactions start with BEGIN IMMEDIATE and wait up to
+    BUSY_TIMEOUT seconds for another writer.  Since only changed keys are written, updates from other processes
+    are kept.  get_stored() finds entries that other processes added after our read().
+
+    If the table doesn't exist yet, it is created from the earlier per-dictionary database (e.g. skiplist.db) or
+    from the Pickle file of the same name (e.g. skiplist.pkl is migrated to table skiplist).
+
+    Usage tracking:  after start_run(), record_hit() counts lookups in memory and write() stores the hit count,
+    last used time and last run number for each key in {table}_usage.  compact() moves entries that were not
+    used in the last N runs to {table}_archive.  get_stored() restores an archived entry.
+    """
+
+    def __init__(self, cache_directory, fname, db_name: str = SETTINGS_DB, table: str = None):
+        """
+        #Args:
+            cache_directory: Directory for database
+            fname: Pickle file name.  Used for migration and for default table name
+            db_name: Database file name.  Default is settings.db
+            table: Table name for this dictionary.  Default is fname without extension.  Characters other than
+                letters, digits and _ are replaced and a hash of the name is added, so different names don't share
+                a table
+        """
+        super().__init__(cache_directory, fname)
+        if table is None:
+            table = os.path.splitext(fname)[0]
+        self.db_name = db_name
+        # Table name is used in SQL text.  Only allow word characters
+        self.table = re.sub(r'\W', '_', table)
+        if self.table != table:
+            # Keep names unique, e.g. my-tree and my_tree
+            self.table += '_' + hashlib.sha1(table.encode('utf-8')).hexdigest()[:10]
+        self.conn = None
+        self.created = False
+        self.usage_tables = False
+        # Not loaded until first use
+        self._dict = None
+        self.replace_all = False
+        self.run = None
+        self.hits = {}
+
+    @property
+    def dict(self):
+        if self._dict is None:
+            self._load()
+        return self._dict
+
+    @dict.setter
+    def dict(self, value):
+        # Whole dictionary replaced.  Next write replaces all rows
+        self._dict = TrackedDict(value)
+        self.replace_all = True
+
+    def _open(self):
+        path = os.path.join(self.cache_directory, self.db_name)
+        # Autocommit mode.  Transactions are started explicitly by _transaction()
+        self.conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        self.conn.execute(f'PRAGMA busy_timeout = {int(BUSY_TIMEOUT * 1000)}')
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.created = self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                         (self.table,)).fetchone() is None
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value BLOB)')
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS {self.table}_meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    def _open_usage(self):
+        # Open database and create usage tracking tables.  Only dictionaries that use tracking have them
+        if self.conn is None:
+            self._open()
+        if self.usage_tables:
+            return
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS {self.table}_usage '
+                          f'(key TEXT PRIMARY KEY, hits INTEGER, last_used REAL, last_run INTEGER)')
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS {self.table}_archive '
+                          f'(key TEXT PRIMARY KEY, value BLOB, hits INTEGER, last_used REAL, last_run INTEGER, '
+                          f'archived REAL)')
+        self.usage_tables = True
+
+    @contextmanager
+    def _transaction(self):
+        # Take the write lock at the start so concurrent writers wait on busy_timeout instead of failing
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+
+    def read(self):
+        # Open database.  Table is loaded on first use of dict.  Returns True if table was missing
+        if self.cache_directory is None:
+            self.logger.debug(f'No directory specified for {self.fname}')
+            return True
+        try:
+            if self.conn is None:
+                self._open()
+        except sqlite3.Error as e:
+            self.logger.error(f'Error reading {self.db_name} {e}')
+            self.error = True
+            return True
+
+        if self.created and self.migrate():
+            self.error = False
+            return False
+
+        # Discard anything loaded before.  Reload on next use
+        self._dict = None
+        self.replace_all = False
+        # Missing if table was just created and there was nothing to migrate
+        self.error = self.created
+        return self.error
+
+    def _load(self):
+        # Load table into dictionary
+        rows = []
+        if self.cache_directory is not None:
+            try:
+                if self.conn is None:
+                    self._open()
+                rows = self.conn.execute(f'SELECT key, value FROM {self.table}').fetchall()
+            except sqlite3.Error as e:
+                self.logger.error(f'Error reading {self.db_name} {e}')
+                self.error = True
+        self._dict = TrackedDict((key, pickle.loads(value)) for key, value in rows)
+        self.replace_all = False
+        self.logger.debug(f'Read success SqliteDict dir={self.cache_directory} db={self.db_name} '
+                          f'table={self.table} len={len(self._dict)}')
+
+    def migrate(self) -> bool:
+        """
+        Table was just created.  Load the earlier per-dictionary database or the Pickle file (if there is one)
+        and store it in the table
+        #Returns:
+            True if data was migrated
+        """
+        legacy_db = os.path.splitext(self.fname)[0] + '.db'
+        legacy_path = os.path.join(self.cache_directory, legacy_db)
+        path = os.path.join(self.cache_directory, self.fname)
+        meta = []
+        usage = []
+        archive = []
+        if legacy_db != self.db_name and os.path.exists(legacy_path):
+            legacy = sqlite3.connect(legacy_path)
+            try:
+                self.dict = {key: pickle.loads(value) for key, value in legacy.execute('SELECT key, value FROM data')}
+                meta = legacy.execute('SELECT key, value FROM data_meta').fetchall()
+                tables = [row[0] for row in legacy.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+                if 'data_usage' in tables:
+                    usage = legacy.execute('SELECT key, hits, last_used, last_run FROM data_usage').fetchall()
+                    archive = legacy.execute('SELECT key, value, hits, last_used, last_run, archived '
+                                             'FROM data_archive').fetchall()
+            except sqlite3.Error as e:
+                self.logger.warning(f'Unable to migrate {legacy_db} {e}')
+                return False
+            finally:
+                legacy.close()
+            source = legacy_db
+        elif os.path.exists(path):
+            with open(path, 'rb') as file:
+                self.dict = pickle.load(file)
+            source = self.fname
+        else:
+            return False
+        self.logger.info(f'Migrating {source} to {self.db_name} table {self.table} len={len(self._dict)}')
+        if self.write():
+            return False
+        for key, value in meta:
+            self.set_meta(key, value)
+        if usage or archive:
+            self._open_usage()
+            with self._transaction():
+                self.conn.executemany(f'INSERT OR REPLACE INTO {self.table}_usage VALUES (?, ?, ?, ?)', usage)
+                self.conn.executemany(f'INSERT OR REPLACE INTO {self.table}_archive VALUES (?, ?, ?, ?, ?, ?)', archive)
+        return True
+
+    def write(self):
+        # Write changed keys to database in one transaction.  Returns True if error
+        if self.cache_directory is None:
+            return True
+        # If the table wasn't loaded, nothing was changed
+        dct = self._dict if self._dict is not None else TrackedDict()
+        try:
+            if self.conn is None:
+                self._open()
+            with self._transaction():
+                if self.replace_all:
+                    self.conn.execute(f'DELETE FROM {self.table}')
+                    keys = list(dct)
+                else:
+                    self.conn.executemany(f'DELETE FROM {self.table} WHERE key = ?',
+                                          [(key,) for key in dct.deleted])
+                    keys = dct.dirty
+                self.conn.executemany(f'INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)',
+                                      [(key, pickle.dumps(dct[key])) for key in keys])
+                if self.run is not None:
+                    self._write_usage(keys)
+        except sqlite3.Error as e:
+            messagebox.showwarning('File Write Error', f'{self.db_name} {e}')
+            return True
+
+        self.logger.debug(f'Write {self.db_name} table={self.table} changed={len(keys)}')
+        dct.mark_clean()
+        self.replace_all = False
+        self.hits = {}
+        return False
+
+    def start_run(self) -> int:
+        """
+        Start usage tracking for this run.  Increments the run counter
+        #Returns:
+            Run number
+        """
+        self._open_usage()
+        self.run = int(self.get_meta('run_count') or 0) + 1
+        self.set_meta('run_count', str(self.run))
+        if self.get_meta('usage_start_run') is None:
+            # Entries without usage rows are treated as used in the run tracking started
+            self.set_meta('usage_start_run', str(self.run))
+        return self.run
+
+    def record_hit(self, key: str):
+        """ Count a lookup hit for key.  Stored by the next write() """
+        if self.run is not None:
+            self.hits[key] = self.hits.get(key, 0) + 1
+
+    def _write_usage(self, changed_keys):
+        # Update usage rows for keys that were hit.  Keys added or changed in this run count as used
+        now = time.time()
+        self.conn.executemany(f'INSERT INTO {self.table}_usage (key, hits, last_used, last_run) VALUES (?, ?, ?, ?) '
+                              f'ON CONFLICT(key) DO UPDATE SET hits = hits + excluded.hits, '
+                              f'last_used = excluded.last_used, last_run = excluded.last_run',
+                              [(key, count, now, self.run) for key, count in self.hits.items()])
+        self.conn.executemany(f'INSERT OR IGNORE INTO {self.table}_usage (key, hits, last_used, last_run) '
+                              f'VALUES (?, 0, ?, ?)', [(key, now, self.run) for key in changed_keys])
+
+    def compact(self, runs: int) -> int:
+        """
+        Move entries that were not used in the last N runs to the archive table
+        #Args:
+            runs: Number of runs
+        #Returns:
+            Number of entries archived
+        """
+        self._open_usage()
+        run_count = int(self.get_meta('run_count') or 0)
+        start_run = int(self.get_meta('usage_start_run') or run_count)
+        cutoff = run_count - runs
+        with self._transaction():
+            self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS stale (key TEXT PRIMARY KEY)')
+            self.conn.execute('DELETE FROM stale')
+            self.conn.execute(f'INSERT INTO stale SELECT d.key FROM {self.table} d '
+                              f'LEFT JOIN {self.table}_usage u ON u.key = d.key '
+                              f'WHERE COALESCE(u.last_run, ?) <= ?', (start_run, cutoff))
+            self.conn.execute(f'INSERT OR REPLACE INTO {self.table}_archive '
+                              f'(key, value, hits, last_used, last_run, archived) '
+                              f'SELECT d.key, d.value, COALESCE(u.hits, 0), u.last_used, u.last_run, ? '
+                              f'FROM {self.table} d JOIN stale s ON s.key = d.key '
+                              f'LEFT JOIN {self.table}_usage u ON u.key = d.key', (time.time(),))
+            stale_keys = [row[0] for row in self.conn.execute('SELECT key FROM stale')]
+            self.conn.execute(f'DELETE FROM {self.table} WHERE key IN (SELECT key FROM stale)')
+            # Remove usage rows for archived keys and for keys that no longer exist
+            self.conn.execute(f'DELETE FROM {self.table}_usage WHERE key NOT IN (SELECT key FROM {self.table})')
+
+        if self._dict is not None:
+            # Already removed from database, so don't track these as deleted
+            for key in stale_keys:
+                if key not in self._dict.dirty:
+                    dict.pop(self._dict, key, None)
+        return len(stale_keys)
+
+    def get_stored(self, key: str):
+        """
+        Look up a key that is not in dict.  Finds entries added by another process after our read() and entries
+        that were archived by compact().  Entry is added to dict (archived entries are restored)
+        #Returns:
+            Value or None if not found
+        """
+        if self.conn is None:
+            return None
+        self._open_usage()
+        # One query for both tables.  Main table entry is used if the key is in both
+        row = self.conn.execute(f'SELECT value, 0 AS archived FROM {self.table} WHERE key = ? UNION ALL '
+                                f'SELECT value, 1 FROM {self.table}_archive WHERE key = ? ORDER BY archived LIMIT 1',
+                                (key, key)).fetchone()
+        if row is None:
+            return None
+        value = pickle.loads(row[0])
+        if not row[1]:
+            dict.__setitem__(self.dict, key, value)
+            return value
+        self.dict[key] = value
+        with self._transaction():
+            self.conn.execute(f'DELETE FROM {self.table}_archive WHERE key = ?', (key,))
+        return value
+
+    def restore_archive(self) -> int:
+        """ Move all archived entries back to the dictionary.  Returns number restored """
+        self._open_usage()
+        with self._transaction():
+            count = self.conn.execute(f'SELECT COUNT(*) FROM {self.table}_archive').fetchone()[0]
+            self.conn.execute(f'INSERT OR IGNORE INTO {self.table} (key, value) '
+                              f'SELECT key, value FROM {self.table}_archive')
+            self.conn.execute(f'DELETE FROM {self.table}_archive')
+        return count
+
+    def usage_stats(self) -> dict:
+        """ Entry counts and run counter for reporting """
+        self._open_usage()
+        return {'entries': self.conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0],
+                'archived': self.conn.execute(f'SELECT COUNT(*) FROM {self.table}_archive').fetchone()[0],
+                'never_hit': self.conn.execute(f'SELECT COUNT(*) FROM {self.table} d '
+                                               f'LEFT JOIN {self.table}_usage u ON u.key = d.key '
+                                               f'WHERE COALESCE(u.hits, 0) = 0').fetchone()[0],
+                'run_count': int(self.get_meta('run_count') or 0)}
+
+    def get_meta(self, key: str):
+        """ Get meta data item for this dictionary (e.g. format version).  None if not set """
+        if self.conn is None:
+            self._open()
+        row = self.conn.execute(f'SELECT value FROM {self.table}_meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        """ Set meta data item for this dictionary """
+        if self.conn is None:
+            self._open()
+        with self._transaction():
+            self.conn.execute(f'INSERT OR REPLACE INTO {self.table}_meta (key, value) VALUES (?, ?)', (key, value))
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
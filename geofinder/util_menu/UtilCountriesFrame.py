@@ -23,7 +23,7 @@ from tkinter import *
 from tkinter import ttk
 from tkinter.ttk import *
 
-from geofinder.util import GridPosition
+from geofinder.util import GridPosition, SqliteDictionary
 from geofinder import AppStyle
 from util_menu import UtilListboxFrame
 from geodata import GeodataFiles, Country
@@ -63,7 +63,7 @@ class SetupCountriesFrame(UtilListboxFrame.ListboxFrame):
         self.listbox_all_countries.config(yscrollcommand=self.scrollbar2.set)
         self.scrollbar2.config(command=self.listbox_all_countries.yview)
 
-        super().__init__(frame, title, cache_dir, cache_filename)
+        super().__init__(frame, title, cache_dir, cache_filename, cache_class=SqliteDictionary.SqliteDictionary)
         self.tree.heading("#0", text="Name", anchor=tk.W)
         self.tree.heading("pre", text="Code", anchor=tk.W)
 
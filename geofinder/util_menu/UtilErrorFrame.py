@@ -30,6 +30,7 @@ from geodata import CachedDictionary, GeoUtil
 from tk_helper import TKHelper as Widge
 
 from geofinder import AppStyle
+from geofinder.util import SqliteDictionary
 
 
 class SetupErrorFrame:
@@ -55,7 +56,7 @@ class SetupErrorFrame:
         self.cache.read()
         self.error_dict = {}  # Keep a dictionary of errors
 
-        self.supported_countries_cd = CachedDictionary.CachedDictionary(self.cache_dir, "country_list.pkl")
+        self.supported_countries_cd = SqliteDictionary.SqliteDictionary(self.cache_dir, "country_list.pkl")
         self.supported_countries_cd.read()
         self.supported_countries_dct: Dict[str, str] = self.supported_countries_cd.dict
 
@@ -20,7 +20,7 @@
 import logging
 from tkinter import ttk
 
-from geofinder.util import GridPosition
+from geofinder.util import GridPosition, SqliteDictionary
 
 
 
@@ -49,7 +49,7 @@ class UtilLanguagesFrame(UtilListboxFrame.ListboxFrame):
         self.add_button = ttk.Button(frame, text="add", command=self.add_handler, width=UtilListboxFrame.BUTTON_WIDTH)
         self.add_label = Widge.CLabel(frame, text="Enter 2 letter ISO language code below and click on Add button to add", style='Info.TLabel')
         self.add_entry: Widge.CEntry = Widge.CEntry(frame, text="   ", width=15)  # , style='Info.TLabel')
-        super().__init__(frame, title, dir_name, cache_filename)
+        super().__init__(frame, title, dir_name, cache_filename, cache_class=SqliteDictionary.SqliteDictionary)
 
         # If dictionary is empty, load in defaults
         if len(self.dict) == 0:
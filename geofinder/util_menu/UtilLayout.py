@@ -26,7 +26,8 @@ from typing import List
 
 from geofinder import AppStyle
 from geofinder.util_menu import (UtilOutputFilterFrame, UtilListboxFrame, UtilReplaceFrame, UtilFeatureFrame, UtilCountriesFrame, UtilLanguagesFrame,
-                                 UtilErrorFrame)
+                                 UtilErrorFrame, UtilSkipFrame)
+from geofinder.util import SqliteDictionary
 
 
 class UtilLayout:
@@ -76,15 +77,17 @@ class UtilLayout:
 
         # Skiplist Tab - ListboxFrame (simple list)
         self.logger.debug(f'====={tab_list[frame]} frame')
-        self.skip_list = UtilListboxFrame.ListboxFrame(self.frames[frame], "Skiplist - Ignore errors for these places",
-                                                       self.cache_dir, "skiplist.pkl")
+        self.skip_list = UtilSkipFrame.SetupSkipFrame(self.frames[frame], "Skiplist - Ignore errors for these places",
+                                                      self.cache_dir, "skiplist.pkl",
+                                                      cache_class=SqliteDictionary.SqliteDictionary)
         self.listbox_list.append(self.skip_list)
         frame += 1
 
         # GlobalReplace Tab- ListboxFrame (simple list)
         self.logger.debug(f'====={tab_list[frame]} frame')
         self.replace_list = UtilReplaceFrame.SetupReplaceFrame(self.frames[frame], "Global Replace  - Replace these errors",
-                                                               self.cache_dir, "global_replace.pkl")
+                                                               self.cache_dir, "global_replace.pkl",
+                                                               cache_class=SqliteDictionary.SqliteDictionary)
         self.listbox_list.append(self.replace_list)
         frame += 1
 
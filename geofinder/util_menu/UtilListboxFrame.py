@@ -42,7 +42,7 @@ class ListboxFrame:
                      Defines overall grid layout for derived classes
     """
 
-    def __init__(self, frame, title, dir_name, cache_filename):
+    def __init__(self, frame, title, dir_name, cache_filename, cache_class=CachedDictionary.CachedDictionary):
         self.logger = logging.getLogger(__name__)
         # Col, Row, padx, pady
         self.grd = {"title_label": [0, 0, 5, 5, "EW"],
@@ -90,7 +90,7 @@ class ListboxFrame:
 
         # Load in list from cache file
         self.directory = dir_name
-        self.cache = CachedDictionary.CachedDictionary(dir_name, cache_filename)
+        self.cache = cache_class(dir_name, cache_filename)
         self.cache.read()
         self.dict = self.cache.dict
         self.logger.debug(f'{self.title}')
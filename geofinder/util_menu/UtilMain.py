@@ -19,11 +19,11 @@
 
 import logging
 import os
-import pickle
 from pathlib import Path
 from tkinter import *
 
-from geodata import CachedDictionary, GeoUtil
+from geodata import GeoUtil
+from geofinder.util import SqliteDictionary
 from util_menu import UtilLayout
 
 try:
@@ -59,7 +59,7 @@ class UtilMain:
         self.cache_dir = GeoUtil.get_cache_directory(self.directory)
 
         # Get configuration settings stored in config pickle file
-        self.cfg: CachedDictionary.CachedDictionary = CachedDictionary.CachedDictionary(self.cache_dir, "config.pkl")
+        self.cfg: SqliteDictionary.SqliteDictionary = SqliteDictionary.SqliteDictionary(self.cache_dir, "config.pkl")
 
         if not os.path.exists(self.directory):
             self.logger.info(f'Creating main folder {self.directory}')
@@ -96,13 +96,11 @@ class UtilMain:
 
             os.makedirs(path)
 
-            # Create empty config file
-            path = os.path.join(self.cache_dir, "config.pkl")
-            self.logger.info(f'Creating config pickle file {path}.')
+            # Create empty config
+            self.logger.info(f'Creating config in {self.cache_dir}.')
 
             self.cfg.set("gedcom_path", "No file selected")
-            with open(path, 'wb') as file:
-                pickle.dump(self.cfg.dict, file)
+            self.cfg.write()
 
         path = self.cfg.get("gedcom_path")
 
@@ -23,7 +23,7 @@ from tkinter import ttk
 
 from tk_helper import TKHelper as Widge
 
-from geofinder.util import GridPosition
+from geofinder.util import CachedDictionary, GridPosition
 from util_menu import UtilListboxFrame
 
 default = []
@@ -53,7 +53,10 @@ class UtilOutputFilterFrame(UtilListboxFrame.ListboxFrame):
         self.add_replace: Widge.CEntry = Widge.CEntry(frame, text=" rr  ", width=15)  # , style='Info.TLabel')
         self.add_label3 = Widge.CLabel(frame, text="Replacement:", style='Info.TLabel')
 
-        super().__init__(frame, title, dir_name, cache_filename)
+        # output_list.pkl is shared by all GeoFinder processes.  Merge with changes from other processes on write
+        super().__init__(frame, title, dir_name, cache_filename,
+                         cache_class=lambda directory, fname: CachedDictionary.CachedDictionary(directory, fname,
+                                                                                                merge=True))
 
         self.tree.heading("#0", text="Original", anchor=tk.W)
         self.tree.heading("pre", text="Replacement", anchor=tk.W)
@@ -36,7 +36,8 @@ class SetupReplaceFrame(UtilListboxFrame.ListboxFrame):
     ListboxFrame defines the overall Grid Layout   
     """
 
-    def __init__(self, frame, title: str, dir_name: str, cache_filename: str):
+    def __init__(self, frame, title: str, dir_name: str, cache_filename: str,
+                 cache_class=CachedDictionary.CachedDictionary):
         # Initialize GEO database
         self.geodb = GeoDB.GeoDB(db_path=os.path.join(dir_name, 'geodata.db'),
                                  spellcheck=None, show_message=True, exit_on_error=True, set_speed_pragmas=True,
@@ -52,7 +53,7 @@ class SetupReplaceFrame(UtilListboxFrame.ListboxFrame):
         self.update_label = TkHelp.CLabel(frame, text="Edit prefix below and click Update", style='Info.TLabel')
         self.edit_entry: TkHelp.CEntry = TkHelp.CEntry(frame, text="   ", width=55)  # , style='Info.TLabel')
 
-        super().__init__(frame, title, dir_name, cache_filename)
+        super().__init__(frame, title, dir_name, cache_filename, cache_class)
         self.tree.heading("#0", text="Original", anchor=tk.W)
         self.tree.heading("pre", text="Replacement", anchor=tk.W)
         self.status.text = "Click to select items above. Then click Remove to remove item, or edit prefix below."
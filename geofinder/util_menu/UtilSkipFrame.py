@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2019.       Mike Herbert
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program; if not, write to the Free Software
+#   Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+import logging
+from tkinter import ttk
+
+from geodata import Normalize
+from tk_helper import TKHelper as Widge
+
+from geofinder import SkipMatcher
+from geofinder.util import GridPosition
+from util_menu import UtilListboxFrame
+
+ADD_TEXT = "Enter place, glob:pattern (glob:at sea*) or re:regex and click on Add"
+
+
+class SetupSkipFrame(UtilListboxFrame.ListboxFrame):
+    """
+    Display Skiplist.  User can delete items or add a skip pattern:
+      place name, e.g.  at sea
+      glob pattern starting with glob:   e.g.  glob:unknown, *
+      regular expression starting with re:   e.g.  re:.*hospital.*
+    SetupSkipFrame is derived from ListboxFrame:
+
+    ListboxFrame Displays a scrolling list box that is based on a CachedDictionary.
+    ListboxFrame defines the overall Grid Layout
+    """
+
+    def __init__(self, frame, title, dir_name, cache_filename, cache_class):
+        self.logger = logging.getLogger(__name__)
+
+        # Add these in addition to the standard widgets we inherit from ListBoxFrame
+        self.add_button = ttk.Button(frame, text="add", command=self.add_handler, width=UtilListboxFrame.BUTTON_WIDTH)
+        self.add_label = Widge.CLabel(frame, text=ADD_TEXT, style='Info.TLabel')
+        self.add_entry: Widge.CEntry = Widge.CEntry(frame, text="   ", width=55)
+
+        super().__init__(frame, title, dir_name, cache_filename, cache_class)
+
+    def configure_widgets(self, frm):
+        # Add the standard widgets in ListBoxFrame
+        super().configure_widgets(frm)
+
+        # Add these in addition to the standard widgets in ListBoxFrame
+        GridPosition.set_grid_position(self.add_button, "add_button", grd=self.grd)
+        GridPosition.set_grid_position(self.add_label, "add_label", grd=self.grd)
+        GridPosition.set_grid_position(self.add_entry, "add_entry", grd=self.grd)
+
+    def add_handler(self):
+        # Allow user to add a pattern to list
+        val: str = self.add_entry.text.strip()
+        if len(val) == 0 or (SkipMatcher.is_pattern(val) and SkipMatcher.compile_pattern(val) is None):
+            self.add_label.text = f'Invalid pattern [{val}]'
+            self.add_label.configure(style='Error.TLabel')
+            return
+        self.add_label.text = ADD_TEXT
+        self.add_label.configure(style='Info.TLabel')
+        if not SkipMatcher.is_pattern(val):
+            # Exact entries are looked up with the normalized place name
+            val = Normalize.normalize(val, remove_commas=False)
+        self.dict[val] = " "  # Add item to dict
+        super().add_handler()